@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+
+from aiohttp import web
+
+import document_reader
+import evaluator
+import job_queue
+
+
+MAX_IN_FLIGHT = int(os.environ.get("CV_API_MAX_IN_FLIGHT", 64))
+MAX_PENDING_JOBS = int(os.environ.get("CV_API_MAX_PENDING_JOBS", 256))
+MAX_UPLOAD_BYTES = int(float(os.environ.get("CV_API_MAX_UPLOAD_MB", 10)) * 1024 * 1024)
+SYNC_TIMEOUT = float(os.environ.get("CV_API_SYNC_TIMEOUT", 300))
+POLL_INTERVAL = 0.25
+SHUTDOWN_TIMEOUT = float(os.environ.get("CV_API_SHUTDOWN_TIMEOUT", 60))
+RETRY_AFTER = "5"
+
+json_response = functools.partial(web.json_response, dumps=functools.partial(json.dumps, ensure_ascii=False))
+
+
+def error(status, message, **headers):
+    return json_response({"error": message}, status=status, headers=headers or None)
+
+
+def job_view(job):
+    """Public JSON form of a job: progress while it runs, results once it is done"""
+    view = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "completed": job["completed"],
+        "total": len(evaluator.AGENT_LABELS),
+        "engine": job["engine"],
+        "fast": bool(job["fast"]),
+    }
+    if job["status"] == job_queue.DONE:
+        view["agents"] = job["agents"]
+        view["coordinator"] = job["coordinator"]
+        view["failed_agents"] = [name for name, result in job["agents"].items() if result is None]
+    elif job["status"] == job_queue.FAILED:
+        view["error"] = job["error"]
+    return view
+
+
+def options(request):
+    """(engine, fast) from the query string"""
+    engine = request.query.get("engine", "agents")
+    if engine not in evaluator.ENGINES:
+        raise web.HTTPBadRequest(text=f"engine must be one of: {', '.join(sorted(evaluator.ENGINES))}")
+    fast = request.query.get("fast", "").lower() in ("1", "true", "yes")
+    return engine, fast
+
+
+async def read_part(part):
+    """Bytes of one multipart part, read in chunks so the upload limit holds (413 beyond it)"""
+    data = bytearray()
+    while chunk := await part.read_chunk():
+        data.extend(chunk)
+        if len(data) > MAX_UPLOAD_BYTES:
+            raise web.HTTPRequestEntityTooLarge(max_size=MAX_UPLOAD_BYTES, actual_size=len(data))
+    return bytes(data)
+
+
+async def read_upload(request):
+    """Document bytes from a multipart upload (first file part) or the raw request body"""
+    if request.content_type.startswith("multipart/"):
+        # client_max_size only covers request.read() and request.post(), not a multipart reader
+        reader = await request.multipart()
+        while (part := await reader.next()) is not None:
+            if part.filename or part.name == "file":
+                return await read_part(part)
+        raise web.HTTPBadRequest(text="multipart upload has no file part")
+    return await request.read()
+
+
+async def extract(request):
+    """CV text of the uploaded document; extraction runs off the event loop"""
+    data = await read_upload(request)
+    if not data:
+        raise web.HTTPBadRequest(text="empty request body")
+    loop = asyncio.get_running_loop()
+    try:
+        cv_text = await loop.run_in_executor(None, document_reader.read_bytes, data)
+    except ValueError as e:
+        raise web.HTTPUnsupportedMediaType(text=str(e))
+    if not cv_text:
+        raise web.HTTPUnprocessableEntity(text="no text could be extracted from the document")
+    return cv_text
+
+
+async def submit(request):
+    """Extract the upload and queue its evaluation; 429 when the queue is full"""
+    engine, fast = options(request)
+    jobs = job_queue.get_queue()
+    if await asyncio.to_thread(jobs.count_active) >= MAX_PENDING_JOBS:
+        raise web.HTTPTooManyRequests(text="evaluation queue is full", headers={"Retry-After": RETRY_AFTER})
+    cv_text = await extract(request)
+    return await asyncio.to_thread(job_queue.submit, cv_text, engine, fast)
+
+
+async def wait_for_job(job_id, timeout):
+    """The job once it is done or failed, or its latest state when `timeout` runs out"""
+    jobs = job_queue.get_queue()
+    deadline = asyncio.get_running_loop().time() + timeout
+    while True:
+        job = await asyncio.to_thread(jobs.get, job_id)
+        if job["status"] not in job_queue.ACTIVE_STATUSES or asyncio.get_running_loop().time() >= deadline:
+            return job
+        await asyncio.sleep(POLL_INTERVAL)
+
+
+@web.middleware
+async def backpressure(request, handler):
+    """Reject work beyond MAX_IN_FLIGHT concurrent requests instead of queueing it in memory"""
+    state = request.app["state"]
+    if request.method != "POST":
+        return await handler(request)
+    if state["in_flight"] >= MAX_IN_FLIGHT:
+        return error(429, "too many requests in flight", **{"Retry-After": RETRY_AFTER})
+    if state["stopping"]:
+        return error(503, "server is shutting down")
+    state["in_flight"] += 1
+    try:
+        return await handler(request)
+    except web.HTTPException as e:
+        if e.status < 400:
+            raise
+        return error(e.status, e.text, **{k: v for k, v in e.headers.items() if k == "Retry-After"})
+    finally:
+        state["in_flight"] -= 1
+
+
+async def evaluate(request):
+    """POST /evaluate: evaluate a document and answer with the results (202 with a job if it takes too long)"""
+    try:
+        timeout = float(request.query.get("timeout", SYNC_TIMEOUT))
+    except ValueError:
+        raise web.HTTPBadRequest(text="timeout must be a number of seconds")
+    job_id = await submit(request)
+    job = await wait_for_job(job_id, min(timeout, SYNC_TIMEOUT))
+    status = 202 if job["status"] in job_queue.ACTIVE_STATUSES else 200
+    return json_response(job_view(job), status=status)
+
+
+async def create_job(request):
+    """POST /jobs: queue a document and answer at once with the job to poll"""
+    job_id = await submit(request)
+    job = await asyncio.to_thread(job_queue.get_queue().get, job_id)
+    return json_response(job_view(job), status=202, headers={"Location": f"/jobs/{job_id}"})
+
+
+async def get_job(request):
+    """GET /jobs/{id}: progress or results of a job"""
+    try:
+        job_id = int(request.match_info["job_id"])
+    except ValueError:
+        return error(404, "job not found")
+    job = await asyncio.to_thread(job_queue.get_queue().get, job_id)
+    if job is None:
+        return error(404, "job not found")
+    return json_response(job_view(job))
+
+
+async def health(request):
+    state = request.app["state"]
+    active = await asyncio.to_thread(job_queue.get_queue().count_active)
+    return json_response({"status": "stopping" if state["stopping"] else "ok",
+                          "in_flight": state["in_flight"], "active_jobs": active})
+
+
+async def on_startup(app):
+    # Starts the worker pool and re-queues jobs left running by a previous process
+    await asyncio.to_thread(job_queue.get_queue)
+
+
+async def on_shutdown(app):
+    # New evaluations get 503 while requests already accepted run to completion
+    app["state"]["stopping"] = True
+
+
+async def on_cleanup(app):
+    await asyncio.to_thread(job_queue.shutdown, SHUTDOWN_TIMEOUT)
+
+
+def create_app():
+    app = web.Application(middlewares=[backpressure], client_max_size=MAX_UPLOAD_BYTES)
+    app["state"] = {"in_flight": 0, "stopping": False}
+    app.add_routes([
+        web.post("/evaluate", evaluate),
+        web.post("/jobs", create_job),
+        web.get("/jobs/{job_id}", get_job),
+        web.get("/health", health),
+    ])
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP API for CV evaluation.")
+    parser.add_argument("--host", default=os.environ.get("CV_API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("CV_API_PORT", 8080)))
+    parser.add_argument("--api-key", help="Gemini API key (default: GEMINI_API_KEY)")
+    args = parser.parse_args(argv)
+
+    evaluator.configure(api_key=args.api_key)
+    web.run_app(create_app(), host=args.host, port=args.port, shutdown_timeout=SHUTDOWN_TIMEOUT)
+
+
+if __name__ == "__main__":
+    main()
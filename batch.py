@@ -0,0 +1,343 @@
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import document_reader
+import evaluator
+import metrics
+import model_routing
+import near_duplicates
+import prompt_compaction
+import rate_limiter
+import relevance
+import result_cache
+
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx")
+# Applicant-tracker exports: one candidate per row, each evaluated as its own CV
+SHEET_EXTENSIONS = (".xlsx", ".xlsm")
+
+
+def collect_files(inputs):
+    """Expand directories and glob patterns into a sorted, de-duplicated list of CV files"""
+    files = set()
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for name in os.listdir(pattern):
+                path = os.path.join(pattern, name)
+                if os.path.isfile(path) and name.lower().endswith(SUPPORTED_EXTENSIONS + SHEET_EXTENSIONS):
+                    files.add(path)
+        else:
+            files.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+    return sorted(files)
+
+
+def load_checkpoint(output_path):
+    """Files whose latest record in an existing output file finished successfully or was not shortlisted"""
+    latest = {}
+    if not os.path.exists(output_path):
+        return set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave a truncated last line; that file simply gets re-run
+                continue
+            latest[record.get("file")] = record.get("status")
+    return {path for path, status in latest.items() if status in ("ok", "skipped")}
+
+
+def extract_file(path):
+    """Extract CV text from a file on disk (runs in a worker process)"""
+    with metrics.span("extract"), open(path, "rb") as f:
+        # Files are already spread over worker processes, so PDF pages are not
+        return document_reader.read_bytes(f.read(), parallel=False)
+
+
+def evaluate_file(path, cv_text, fast=False, engine="agents", duplicates="off", job_description=None, ranking=None):
+    """Run the agents and coordinator on extracted text and build the output record.
+
+    With `duplicates` set to "reuse" or "flag", a near-duplicate of an earlier
+    CV gets that CV's agent results, or is evaluated and marked for review.
+    Results produced under other prompts, model or engine are never reused.
+    A job description scores the keyword criteria; `ranking` is its shortlist position.
+    """
+    started = time.monotonic()
+    match = signature = None
+    fingerprint = evaluator.evaluation_fingerprint(engine, job_description)
+    try:
+        with metrics.trace() as stage_trace:
+            if duplicates != "off":
+                with metrics.span("dedupe") as span:
+                    signature = near_duplicates.minhash(cv_text)
+                    match = near_duplicates.get_index().lookup(signature, fingerprint)
+                    span.outcome = "miss" if not match else "match" if match["agents"] is not None else "stale"
+            reused = match is not None and match["agents"] is not None and duplicates == "reuse"
+            if reused:
+                # No model call: the rule-based criteria and totals are recomputed on this text
+                agent_results = evaluator.run_agents(cv_text, reuse=match["agents"], job_description=job_description)
+            else:
+                agent_results = evaluator.run_evaluation(cv_text, engine=engine, job_description=job_description)
+            coordinator_result = evaluator.run_coordinator(agent_results, fast=fast)
+    except Exception as e:
+        return {"file": path, "status": "error", "error": str(e)}
+
+    failed_agents = [name for name, result in agent_results.items() if result is None]
+    cv_hash = result_cache.text_hash(cv_text)
+    record = {
+        "file": path,
+        "status": "error" if failed_agents else "ok",
+        "engine": engine,
+        "cv_sha256": cv_hash,
+        "coordinator": coordinator_result,
+        "agents": agent_results,
+        "seconds": round(time.monotonic() - started, 3),
+        "stages": stage_trace.records,
+    }
+    if failed_agents:
+        record["error"] = f"agents failed: {', '.join(failed_agents)}"
+    if evaluator.COMPACT_CV_TEXT:
+        # Cached from the evaluation, so this costs nothing
+        record["compaction"] = prompt_compaction.compact(cv_text)[1]
+    if ranking:
+        record["relevance"] = ranking
+    if match:
+        record["duplicate_of"] = {"file": match["label"], "similarity": round(match["similarity"], 3)}
+        record["review"] = duplicates == "flag"
+    # Fresh results replace a stale entry, so later copies can reuse them
+    if signature is not None and not failed_agents and not reused and (match is None or match["agents"] is None):
+        near_duplicates.get_index().add(signature, cv_hash, path, agent_results, fingerprint)
+    return record
+
+
+def repair_output(output_path):
+    """Terminate a line left truncated by a crash so the next record starts cleanly"""
+    if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+        with open(output_path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+
+class RecordWriter:
+    """Thread-safe JSONL appender that counts records by status and reports progress"""
+
+    def __init__(self, out, total=None):
+        self.out = out
+        self.total = total
+        self.lock = threading.Lock()
+        self.counts = {"ok": 0, "error": 0, "skipped": 0}
+
+    def write(self, record):
+        with self.lock:
+            self.out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.out.flush()
+            self.counts[record["status"]] += 1
+            done = sum(self.counts.values())
+            progress = f"{done}/{self.total}" if self.total else str(done)
+            print(f"[{progress}] {record['status']}: {record['file']}", file=sys.stderr)
+
+
+def shortlist(labels, job_description, top_k=None):
+    """Rank indexed CVs against a job description: ({label: ranking}, labels to evaluate)"""
+    ranked = relevance.get_index().rank(job_description, labels=labels)
+    rankings = {label: {"rank": rank, "score": round(score, 3)} for rank, (label, score) in enumerate(ranked, 1)}
+    selected = {label for label, _ in ranked[:top_k]} if top_k else set(rankings)
+    print(f"Shortlisted {len(selected)} of {len(rankings)} candidates against the job description", file=sys.stderr)
+    return rankings, selected
+
+
+def run_batch(files, output_path, workers=4, extract_processes=None, fast=False, engine="agents",
+              duplicates="off", job_description=None, top_k=None):
+    """Extract in a process pool, evaluate in a thread pool and append one JSONL record per CV.
+
+    With a job description, every CV is extracted and indexed first, and only
+    the `top_k` most relevant are evaluated; the rest get a "skipped" record.
+    """
+    repair_output(output_path)
+    with open(output_path, "a", encoding="utf-8") as out:
+        writer = RecordWriter(out, total=len(files))
+
+        def on_evaluated(future):
+            writer.write(future.result())
+
+        with ProcessPoolExecutor(max_workers=extract_processes) as extract_pool, \
+                ThreadPoolExecutor(max_workers=workers) as evaluate_pool:
+
+            def evaluate(path, cv_text, ranking=None):
+                evaluate_pool.submit(
+                    evaluate_file, path, cv_text, fast, engine, duplicates, job_description, ranking
+                ).add_done_callback(on_evaluated)
+
+            extracted = {}
+            extractions = {extract_pool.submit(extract_file, path): path for path in files}
+            for future in as_completed(extractions):
+                path = extractions[future]
+                try:
+                    cv_text = future.result()
+                except Exception as e:
+                    cv_text = None
+                    error = str(e)
+                else:
+                    error = "no text extracted"
+                if not cv_text:
+                    writer.write({"file": path, "status": "error", "error": error})
+                elif job_description:
+                    relevance.get_index().add(path, cv_text)
+                    extracted[path] = cv_text
+                else:
+                    evaluate(path, cv_text)
+
+            if job_description:
+                rankings, selected = shortlist(extracted, job_description, top_k)
+                for path, ranking in rankings.items():
+                    if path in selected:
+                        evaluate(path, extracted.pop(path), ranking)
+                    else:
+                        writer.write({"file": path, "status": "skipped", "relevance": ranking})
+
+    return writer.counts
+
+
+def iter_sheet_candidates(sheet_path, columns=None, id_column=None):
+    """Yield (candidate id, CV text) for each row of a spreadsheet"""
+    # The id column is read even when it is not one of the CV columns
+    read_columns = columns + [id_column] if columns and id_column and id_column not in columns else columns
+    for row_number, record in document_reader.iter_excel_rows(sheet_path, columns=read_columns):
+        candidate_id = f"{sheet_path}#{record.get(id_column, row_number) if id_column else row_number}"
+        if read_columns is not columns:
+            record.pop(id_column, None)
+        yield candidate_id, document_reader.record_text(record)
+
+
+def run_sheet(sheet_path, output_path, workers=4, fast=False, engine="agents",
+              columns=None, id_column=None, done=frozenset(), duplicates="off",
+              job_description=None, top_k=None):
+    """Stream the rows of a spreadsheet and evaluate each one as its own CV.
+
+    Rows are read one at a time and at most 2 x `workers` are held in memory,
+    so memory stays flat regardless of sheet size. Each record's "file" is
+    `<sheet>#<id>`, where the id is the `id_column` value or the row number,
+    and ids already in `done` are skipped. With a job description, a first
+    pass indexes every row on disk and a second pass evaluates the shortlist.
+    """
+    repair_output(output_path)
+    rankings = selected = None
+    if job_description:
+        index = relevance.get_index()
+        labels = []
+        for candidate_id, cv_text in iter_sheet_candidates(sheet_path, columns, id_column):
+            if candidate_id not in done:
+                index.add(candidate_id, cv_text)
+                labels.append(candidate_id)
+        rankings, selected = shortlist(labels, job_description, top_k)
+
+    in_flight = threading.BoundedSemaphore(workers * 2)
+    with open(output_path, "a", encoding="utf-8") as out:
+        writer = RecordWriter(out)
+
+        def on_evaluated(future):
+            in_flight.release()
+            writer.write(future.result())
+
+        with ThreadPoolExecutor(max_workers=workers) as evaluate_pool:
+            for candidate_id, cv_text in iter_sheet_candidates(sheet_path, columns, id_column):
+                if candidate_id in done:
+                    continue
+                ranking = rankings.get(candidate_id) if rankings else None
+                if selected is not None and candidate_id not in selected:
+                    writer.write({"file": candidate_id, "status": "skipped", "relevance": ranking})
+                    continue
+                in_flight.acquire()
+                evaluate_pool.submit(
+                    evaluate_file, candidate_id, cv_text, fast, engine, duplicates, job_description, ranking
+                ).add_done_callback(on_evaluated)
+
+    return writer.counts
+
+
+def print_routing_report():
+    """Escalation rate and estimated latency saved by the fast model, per stage"""
+    rows = model_routing.stats.summary(evaluator.MODEL_NAME)
+    if not rows:
+        return
+    print(f"Model routing: {model_routing.FAST_MODEL} escalating to {evaluator.MODEL_NAME}", file=sys.stderr)
+    for row in rows:
+        reasons = ", ".join(f"{reason} {count}" for reason, count in sorted(row["reasons"].items())) or "none"
+        saved = f"{row['saved_seconds']:.1f}s saved" if row["saved_seconds"] is not None else "saving unknown"
+        if row["strong_estimated"]:
+            saved += " (estimated)"
+        print(f"  {row['stage']}: {row['escalated']}/{row['calls']} escalated ({row['escalation_rate']:.0%}; {reasons}), "
+              f"{saved}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a directory or glob of CVs and write one JSONL record per CV.")
+    parser.add_argument("inputs", nargs="+", help="Directories or glob patterns of CV files (.pdf, .docx) or candidate sheets (.xlsx)")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL output file; existing successful records are skipped on resume")
+    parser.add_argument("--workers", type=int, default=4, help="CVs evaluated concurrently")
+    parser.add_argument("--extract-processes", type=int, default=None, help="Processes used for text extraction (default: CPU count)")
+    parser.add_argument("--fast", action="store_true", help="Skip the coordinator call and summarise locally")
+    parser.add_argument("--engine", choices=sorted(evaluator.ENGINES), default="agents", help="Five agent calls or one fused call per CV")
+    parser.add_argument("--columns", help="Comma-separated sheet columns that make up a candidate's CV (default: all)")
+    parser.add_argument("--id-column", help="Sheet column identifying a candidate across runs (default: row number)")
+    parser.add_argument("--duplicates", choices=near_duplicates.ACTIONS, default=near_duplicates.DEFAULT_ACTION,
+                        help="Near-duplicates of already evaluated CVs: reuse their results, flag them for review, or ignore")
+    parser.add_argument("--duplicate-threshold", type=float, help="Similarity above which CVs count as near-duplicates (default: CV_DUPLICATE_THRESHOLD or 0.9)")
+    parser.add_argument("--job-description", help="Text file with the job description: ranks candidates and scores keyword criteria against it")
+    parser.add_argument("--top-k", type=int, help="With --job-description, evaluate only the K most relevant candidates")
+    parser.add_argument("--requests-per-minute", type=float, help="Override GEMINI_REQUESTS_PER_MINUTE")
+    parser.add_argument("--tokens-per-minute", type=float, help="Override GEMINI_TOKENS_PER_MINUTE")
+    parser.add_argument("--api-key", help="Gemini API key (default: GEMINI_API_KEY)")
+    args = parser.parse_args(argv)
+
+    evaluator.configure(api_key=args.api_key)
+    if args.requests_per_minute or args.tokens_per_minute:
+        limiter = rate_limiter.get_limiter()
+        rate_limiter.configure(
+            requests_per_minute=args.requests_per_minute or limiter.requests.rate * 60,
+            tokens_per_minute=args.tokens_per_minute or limiter.tokens.rate * 60,
+            max_concurrency=limiter.concurrency.maximum,
+        )
+
+    if args.duplicate_threshold is not None:
+        near_duplicates.configure(args.duplicate_threshold)
+    job_description = None
+    if args.job_description:
+        with open(args.job_description, encoding="utf-8") as f:
+            job_description = f.read()
+    files = collect_files(args.inputs)
+    sheets = [path for path in files if path.lower().endswith(SHEET_EXTENSIONS)]
+    documents = [path for path in files if path not in sheets]
+    done = load_checkpoint(args.output)
+    pending = [path for path in documents if path not in done]
+    if documents:
+        print(f"{len(documents)} files, {len(documents) - len(pending)} already done, {len(pending)} to evaluate", file=sys.stderr)
+
+    counts = {"ok": 0, "error": 0, "skipped": 0}
+    if pending:
+        for status, count in run_batch(pending, args.output, args.workers, args.extract_processes, args.fast, args.engine,
+                                       args.duplicates, job_description, args.top_k).items():
+            counts[status] += count
+    columns = [column.strip() for column in args.columns.split(",")] if args.columns else None
+    for sheet in sheets:
+        print(f"Streaming candidates from {sheet}", file=sys.stderr)
+        sheet_counts = run_sheet(sheet, args.output, args.workers, args.fast, args.engine,
+                                 columns=columns, id_column=args.id_column, done=done, duplicates=args.duplicates,
+                                 job_description=job_description, top_k=args.top_k)
+        for status, count in sheet_counts.items():
+            counts[status] += count
+
+    print(f"Finished: {counts['ok']} ok, {counts['error']} failed, {counts['skipped']} not shortlisted", file=sys.stderr)
+    print_routing_report()
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""End-to-end latency benchmark that runs entirely offline.
+
+Usage (from the repository root):
+
+    python -m benchmarks.end_to_end --cvs 20 --concurrency 4 --latency 1.5 --burst-rate 0.05
+
+The model is replaced by model_backends.FakeBackend, with configurable
+latency, error rate and 429 bursts. The report covers p50/p95 end-to-end
+latency per CV, throughput in CVs/minute, and extraction time per page for
+test.pdf and synthetic multi-page CVs. The result cache is disabled so
+every CV pays for its model calls.
+"""
+import argparse
+import math
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import evaluator
+import model_backends
+import rate_limiter
+import result_cache
+
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test.pdf")
+
+SYNTHETIC_SECTIONS = [
+    ("PROFESSIONAL SUMMARY", "Data analyst with {n} years of experience turning raw data into decisions."),
+    ("WORK EXPERIENCE", "- Data Analyst, PT Contoh {n}, Jakarta (2019 - 2023): built dashboards used by 40 teams."),
+    ("EDUCATION", "S1 Statistika, Universitas Contoh {n}, 2018, IPK 3.6"),
+    ("SKILLS", "Python, SQL, Tableau, statistik, komunikasi, skill {n}"),
+    ("CERTIFICATIONS", "Google Data Analytics Certificate {n}"),
+]
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def synthetic_cv_text(pages=2, lines_per_page=45):
+    """Plain-text CV with the usual sections, roughly `pages` pages long"""
+    lines = ["Budi Santoso", "budi.santoso@example.com | +62 812 0000 0000 | linkedin.com/in/budi"]
+    n = 0
+    while len(lines) < pages * lines_per_page:
+        for heading, line in SYNTHETIC_SECTIONS:
+            n += 1
+            lines.append(heading)
+            lines.extend(line.format(n=n) for _ in range(6))
+    return "\n".join(lines)
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(pages=20, lines_per_page=45):
+    """Minimal valid PDF with `pages` pages of CV-like text (no third-party writer needed)"""
+    lines = synthetic_cv_text(pages, lines_per_page).splitlines()
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        page_lines = lines[page * lines_per_page:(page + 1) * lines_per_page]
+        content = "BT /F1 10 Tf 50 800 Td 14 TL " + " ".join(f"({_pdf_escape(line)}) '" for line in page_lines) + " ET"
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def count_pages(pdf_bytes):
+    return len(re.findall(rb"/Type\s*/Page[^s]", pdf_bytes))
+
+
+def benchmark_extraction(samples, repeat):
+    """Print extraction time per page; returns the extracted text of the first sample"""
+    import document_reader
+
+    # PyPDF2 is imported on first extraction, so a missing install shows up here
+    try:
+        document_reader.convert_pdf_bytes(samples[0][1])
+    except ImportError as e:
+        print(f"Extraction benchmark skipped ({e})")
+        return None
+
+    print(f"{'document':<18} {'pages':>5} {'median s':>9} {'ms/page':>8}")
+    first_text = None
+    for name, data in samples:
+        pages = max(1, count_pages(data))
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            text = document_reader.convert_pdf_bytes(data)
+            timings.append(time.perf_counter() - started)
+        first_text = first_text or text
+        median = statistics.median(timings)
+        print(f"{name:<18} {pages:>5} {median:>9.3f} {median / pages * 1000:>8.1f}")
+    return first_text
+
+
+def benchmark_pipeline(cv_texts, concurrency, engine, fast):
+    """Evaluate every CV end to end; returns (per-CV latencies, wall-clock seconds)"""
+    def evaluate(cv_text):
+        started = time.perf_counter()
+        results = evaluator.run_evaluation(cv_text, engine=engine)
+        evaluator.run_coordinator(results, fast=fast)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(evaluate, cv_texts))
+    return latencies, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark with a fake model backend.")
+    parser.add_argument("--cvs", type=int, default=20, help="CVs evaluated end to end")
+    parser.add_argument("--concurrency", type=int, default=4, help="CVs evaluated at the same time")
+    parser.add_argument("--engine", choices=sorted(evaluator.ENGINES), default="agents")
+    parser.add_argument("--fast", action="store_true", help="Skip the coordinator call")
+    parser.add_argument("--latency", type=float, default=1.0, help="Mean fake model latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Standard deviation of the fake latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of a fake 503 per call")
+    parser.add_argument("--burst-rate", type=float, default=0.0, help="Probability per call that a burst of 429s starts")
+    parser.add_argument("--burst-length", type=int, default=3, help="Consecutive 429s per burst")
+    parser.add_argument("--requests-per-minute", type=float, default=600, help="Rate limiter request quota")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Rate limiter concurrency ceiling")
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 20, 40], help="Synthetic PDF sizes for the extraction benchmark")
+    parser.add_argument("--extract-repeat", type=int, default=3, help="Extraction runs per document")
+    args = parser.parse_args(argv)
+
+    samples = []
+    if os.path.exists(SAMPLE_PDF):
+        with open(SAMPLE_PDF, "rb") as f:
+            samples.append(("test.pdf", f.read()))
+    samples.extend((f"synthetic-{pages}p", synthetic_pdf(pages)) for pages in args.pages)
+    sample_text = benchmark_extraction(samples, args.extract_repeat)
+
+    evaluator.configure(backend=model_backends.FakeBackend(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        burst_rate=args.burst_rate, burst_length=args.burst_length,
+    ))
+    rate_limiter.configure(
+        requests_per_minute=args.requests_per_minute,
+        max_concurrency=args.max_concurrency,
+        base_delay=min(1.0, args.latency),
+    )
+    result_cache.set_cache(result_cache.NullCache())
+
+    # Vary the text per CV so nothing is shared between evaluations
+    base_text = sample_text or synthetic_cv_text()
+    cv_texts = [f"{base_text}\n\nKandidat #{i}" for i in range(args.cvs)]
+    latencies, wall = benchmark_pipeline(cv_texts, args.concurrency, args.engine, args.fast)
+
+    print(f"\nPipeline ({args.engine}, {args.cvs} CVs, concurrency {args.concurrency})")
+    print(f"  p50 latency   {percentile(latencies, 0.50):.2f} s")
+    print(f"  p95 latency   {percentile(latencies, 0.95):.2f} s")
+    print(f"  throughput    {args.cvs / wall * 60:.1f} CVs/minute")
+    print(f"  model calls   {evaluator.get_backend().calls}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Compare the fused single-call engine with the five-agent pipeline.
+
+Usage (from the repository root):
+
+    GEMINI_API_KEY=... python -m benchmarks.fused_vs_pipeline test.pdf cvs/*.pdf
+
+Reports per-engine latency, estimated token usage and how closely the
+fused scores agree with the pipeline's. The result cache is disabled so
+every run pays for real model calls, and model routing is turned off so
+both engines use the same model.
+"""
+import argparse
+import json
+import statistics
+import time
+
+import batch
+import evaluator
+import model_routing
+import prompt_compaction
+import rate_limiter
+import result_cache
+import scoring
+
+
+def estimated_tokens(engine, cv_text, results):
+    """(input, output) token estimates for the agent stage of one evaluation"""
+    # The prompts carry the compacted text, as in the evaluation itself
+    if evaluator.COMPACT_CV_TEXT:
+        cv_text = prompt_compaction.compact(cv_text)[0]
+    if engine == "fused":
+        prompt_tokens = rate_limiter.estimate_tokens(evaluator.render_prompt(evaluator.FUSED_PROMPT, cv_text))
+    else:
+        found = evaluator.cv_sections.split_sections(cv_text)
+        prompt_tokens = sum(
+            rate_limiter.estimate_tokens(
+                evaluator.render_prompt(evaluator.AGENT_PROMPTS[agent_name], evaluator.agent_input(agent_name, cv_text, found))
+            )
+            for agent_name in evaluator.AGENT_LABELS
+        )
+    output_tokens = sum(
+        rate_limiter.estimate_tokens(json.dumps(result, ensure_ascii=False))
+        for result in results.values() if result
+    )
+    return prompt_tokens, output_tokens
+
+
+def run_engine(engine, cv_text):
+    started = time.perf_counter()
+    results = evaluator.run_evaluation(cv_text, engine=engine)
+    seconds = time.perf_counter() - started
+    prompt_tokens, output_tokens = estimated_tokens(engine, cv_text, results)
+    return {
+        "seconds": seconds,
+        "prompt_tokens": prompt_tokens,
+        "output_tokens": output_tokens,
+        "results": results,
+        "scores": scoring.aggregate_scores(results),
+    }
+
+
+def agreement(pipeline, fused):
+    """Per-agent absolute score difference in percentage points (agents both engines scored)"""
+    differences = {}
+    for agent_name in evaluator.AGENT_LABELS:
+        a, b = pipeline["results"].get(agent_name), fused["results"].get(agent_name)
+        if a and b:
+            differences[agent_name] = abs(
+                scoring.agent_percentage(agent_name, a) - scoring.agent_percentage(agent_name, b)
+            )
+    return differences
+
+
+def summarise(runs, key):
+    values = [run[key] for run in runs]
+    return statistics.mean(values), statistics.median(values)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the fused engine against the five-agent pipeline.")
+    parser.add_argument("files", nargs="+", help="CV files (.pdf, .docx)")
+    parser.add_argument("--repeat", type=int, default=1, help="Evaluations per file and engine")
+    parser.add_argument("--api-key", help="Gemini API key (default: GEMINI_API_KEY)")
+    args = parser.parse_args(argv)
+
+    evaluator.configure(api_key=args.api_key)
+    result_cache.set_cache(result_cache.NullCache())
+    # The fused engine always uses the main model, so the pipeline must too
+    model_routing.ROUTING = "off"
+
+    runs = {"agents": [], "fused": []}
+    differences = {agent_name: [] for agent_name in evaluator.AGENT_LABELS}
+    total_differences = []
+    category_matches = []
+    for path in args.files:
+        cv_text = batch.extract_file(path)
+        for _ in range(args.repeat):
+            pipeline = run_engine("agents", cv_text)
+            fused = run_engine("fused", cv_text)
+            runs["agents"].append(pipeline)
+            runs["fused"].append(fused)
+            for agent_name, difference in agreement(pipeline, fused).items():
+                differences[agent_name].append(difference)
+            total_differences.append(abs(pipeline["scores"]["total_score"] - fused["scores"]["total_score"]))
+            category_matches.append(pipeline["scores"]["kategori"] == fused["scores"]["kategori"])
+
+    print(f"{'engine':<8} {'mean s':>8} {'median s':>9} {'prompt tok':>11} {'output tok':>11}")
+    for engine, engine_runs in runs.items():
+        mean_s, median_s = summarise(engine_runs, "seconds")
+        prompt_tokens, _ = summarise(engine_runs, "prompt_tokens")
+        output_tokens, _ = summarise(engine_runs, "output_tokens")
+        print(f"{engine:<8} {mean_s:>8.2f} {median_s:>9.2f} {prompt_tokens:>11.0f} {output_tokens:>11.0f}")
+
+    print("\nScore agreement (mean absolute difference, percentage points)")
+    for agent_name, values in differences.items():
+        shown = f"{statistics.mean(values):.1f}" if values else "n/a"
+        print(f"  {agent_name:<18} {shown}")
+    print(f"  {'total_score':<18} {statistics.mean(total_differences):.1f}")
+    print(f"  kategori match     {sum(category_matches)}/{len(category_matches)}")
+
+
+if __name__ == "__main__":
+    main()
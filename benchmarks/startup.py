@@ -0,0 +1,100 @@
+"""Cold-start benchmark: module import time and first-render latency of the app.
+
+Usage (from the repository root):
+
+    python -m benchmarks.startup --repeat 5
+
+Every measurement runs in a fresh interpreter, as on a new container. The
+report covers the import time of each pipeline module, the slowest imports
+behind `app.py` (from `python -X importtime`) and, when Streamlit is
+installed, the time until the first full render of the page. The fake model
+backend is used, so no API key or network is needed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["evaluator", "document_reader", "job_queue", "batch"]
+
+IMPORT_SNIPPET = """
+import time
+started = time.perf_counter()
+import {module}
+print(time.perf_counter() - started)
+"""
+
+RENDER_SNIPPET = """
+import time
+started = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file("app.py", default_timeout=60)
+app.run()
+first = time.perf_counter() - started
+started = time.perf_counter()
+app.run()
+print(first, time.perf_counter() - started)
+"""
+
+
+def run_snippet(code, extra_args=()):
+    """stdout and stderr of `code` in a fresh interpreter at the repository root"""
+    env = dict(os.environ, CV_MODEL_BACKEND="fake", PYTHONDONTWRITEBYTECODE="1")
+    completed = subprocess.run(
+        [sys.executable, *extra_args, "-c", code], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return completed.stdout, completed.stderr
+
+
+def import_times(module, repeat):
+    return [float(run_snippet(IMPORT_SNIPPET.format(module=module))[0]) for _ in range(repeat)]
+
+
+def slowest_imports(modules, top):
+    """(self seconds, module) of the slowest imports pulled in by `modules`"""
+    _, stderr = run_snippet(f"import {modules}", ("-X", "importtime"))
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            rows.append((int(self_us) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start import and first-render benchmark.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement")
+    parser.add_argument("--top", type=int, default=10, help="Slowest individual imports listed")
+    args = parser.parse_args(argv)
+
+    print(f"{'module':<18} {'median ms':>10} {'max ms':>8}")
+    for module in MODULES:
+        try:
+            timings = import_times(module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<18} failed: {e.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{module:<18} {statistics.median(timings) * 1000:>10.1f} {max(timings) * 1000:>8.1f}")
+
+    print("\nSlowest imports behind the pipeline modules (own time)")
+    for seconds, name in slowest_imports(", ".join(MODULES), args.top):
+        print(f"  {seconds * 1000:>8.1f} ms  {name}")
+
+    try:
+        renders = [tuple(map(float, run_snippet(RENDER_SNIPPET)[0].split())) for _ in range(args.repeat)]
+    except subprocess.CalledProcessError as e:
+        print(f"\nFirst render skipped ({e.stderr.strip().splitlines()[-1]})")
+        return
+    print("\nApp render (streamlit.testing AppTest)")
+    print(f"  first render  {statistics.median(first for first, _ in renders) * 1000:.1f} ms (median)")
+    print(f"  rerun         {statistics.median(rerun for _, rerun in renders) * 1000:.1f} ms (median)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import re
+
+
+# Heading variants (Indonesian and English) for each CV section, matched case-insensitively
+SECTION_HEADINGS = {
+    "contact": [
+        "contact", "contact information", "contact details", "personal information", "personal details",
+        "personal data", "kontak", "informasi kontak", "data pribadi", "data diri", "biodata", "identitas",
+    ],
+    "summary": [
+        "summary", "professional summary", "career summary", "profile", "professional profile", "about me",
+        "about", "objective", "career objective", "ringkasan", "ringkasan profesional", "profil",
+        "profil singkat", "profil profesional", "tentang saya", "tujuan karir", "tujuan karier",
+    ],
+    "experience": [
+        "experience", "work experience", "professional experience", "working experience", "employment",
+        "employment history", "work history", "career history", "internship", "internships",
+        "internship experience", "pengalaman", "pengalaman kerja", "pengalaman bekerja",
+        "pengalaman profesional", "riwayat pekerjaan", "riwayat kerja", "pengalaman magang", "magang",
+    ],
+    "education": [
+        "education", "educational background", "academic background", "academic history", "academics",
+        "pendidikan", "riwayat pendidikan", "latar belakang pendidikan", "pendidikan formal",
+    ],
+    "skills": [
+        "skills", "skill", "technical skills", "hard skills", "soft skills", "core competencies",
+        "competencies", "expertise", "keterampilan", "keahlian", "kemampuan", "kompetensi",
+        "keterampilan teknis",
+    ],
+    "optional": [
+        "certifications", "certification", "certificates", "licenses", "projects", "project", "awards",
+        "honors", "achievements", "languages", "language", "volunteer", "volunteering",
+        "volunteer experience", "organizations", "organization", "organizational experience",
+        "interests", "hobbies", "publications", "training", "trainings", "courses", "references",
+        "sertifikasi", "sertifikat", "lisensi", "proyek", "penghargaan", "prestasi", "bahasa",
+        "pengalaman organisasi", "organisasi", "kegiatan sukarela", "relawan", "minat", "hobi",
+        "publikasi", "pelatihan", "kursus", "referensi",
+    ],
+}
+
+# Longest variants first so "pengalaman organisasi" is not read as "pengalaman"
+_ALIASES = sorted(
+    ((alias, section) for section, aliases in SECTION_HEADINGS.items() for alias in aliases),
+    key=lambda item: len(item[0]),
+    reverse=True,
+)
+_SECTION_BY_ALIAS = dict(_ALIASES)
+_HEADING_RE = re.compile(
+    r"^(" + "|".join(re.escape(alias) for alias, _ in _ALIASES) + r")\b(?:\s*(?:&|and|dan|/|,)\s*[\w ]{0,30})?$"
+)
+# A heading run into its first line of content ("Skills Laravel"), as PDF extraction joins two-column layouts
+_INLINE_HEADING_RE = re.compile(
+    r"^(" + "|".join(re.escape(alias) for alias, _ in _ALIASES) + r")\s*:?\s+(\S)", re.IGNORECASE
+)
+# Markdown and decoration that PDF text extraction leaves around headings
+_DECORATION_RE = re.compile(r"[#*_=|>`:\-–—•]+")
+
+MAX_HEADING_LENGTH = 50
+MAX_HEADER_LENGTH = 600
+
+
+def heading_section(line, inline=False):
+    """Section name if `line` looks like a section heading, else None.
+
+    With `inline`, a capitalised heading followed on the same line by content
+    starting with a capital or digit ("Education SMKN 1 Pasuruan") counts too.
+    """
+    text = _DECORATION_RE.sub(" ", line).strip().lower()
+    text = " ".join(text.split())
+    if text and len(text) <= MAX_HEADING_LENGTH:
+        match = _HEADING_RE.match(text)
+        if match:
+            return _SECTION_BY_ALIAS[match.group(1)]
+    if not inline:
+        return None
+    match = _INLINE_HEADING_RE.match(line.strip())
+    if not match:
+        return None
+    heading, first = match.groups()
+    if not (heading.istitle() or heading.isupper()) or not (first.isupper() or first.isdigit()):
+        return None
+    return _SECTION_BY_ALIAS[heading.lower()]
+
+
+def split_sections(cv_text):
+    """Split CV text into {"header": ..., "contact": ..., "summary": ..., ...}.
+
+    "header" is everything before the first recognised heading (usually the
+    name and contact line). Sections that appear several times are joined.
+    Headings run into their first line of content are only looked for when no
+    heading stands on a line of its own, so job titles such as "Project
+    Manager" are not taken for headings in CVs that have them.
+    """
+    found = _split(cv_text)
+    if len(found) == 1 and "header" in found:
+        found = _split(cv_text, inline=True)
+    return found
+
+
+def _split(cv_text, inline=False):
+    parts = {"header": []}
+    current = "header"
+    for line in cv_text.splitlines():
+        section = heading_section(line, inline)
+        if section:
+            current = section
+            parts.setdefault(current, [])
+        parts[current].append(line)
+    return {section: "\n".join(lines).strip() for section, lines in parts.items() if any(l.strip() for l in lines)}
+
+
+def slice_for(cv_text, sections, labels=None, found=None):
+    """Text containing only `sections` plus a short shared header.
+
+    Falls back to the full text when none of the requested sections are found,
+    so an unusual layout never leaves an agent with nothing to evaluate.
+    Pass `found` (the output of split_sections) to avoid re-splitting.
+    """
+    if found is None:
+        found = split_sections(cv_text)
+    selected = [found[section] for section in sections if section in found]
+    if not selected:
+        return cv_text
+
+    header = found.get("header", "")[:MAX_HEADER_LENGTH]
+    parts = []
+    if labels:
+        parts.append(f"[Cuplikan CV, hanya bagian: {', '.join(labels)}]")
+    if header:
+        parts.append(header)
+    parts.extend(selected)
+    return "\n\n".join(parts)
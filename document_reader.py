@@ -1,19 +1,217 @@
-import PyPDF2
-import docx
-import pandas as pd
+import io
+import logging
 import os
-import tempfile
+import threading
+import time
+from concurrent.futures import TimeoutError
+
+# Extraction budget, so a huge upload cannot stall a worker
+PDF_MAX_PAGES = int(os.environ.get("CV_PDF_MAX_PAGES", 50))
+PDF_TIME_BUDGET = float(os.environ.get("CV_PDF_TIME_BUDGET", 30))
+# Documents with at least this many pages are extracted across a process pool
+PDF_PARALLEL_PAGES = int(os.environ.get("CV_PDF_PARALLEL_PAGES", 16))
+PDF_PROCESSES = int(os.environ.get("CV_PDF_PROCESSES", 0)) or os.cpu_count() or 1
+# Workers stop at the budget between pages; their partial ranges are awaited this much longer
+PDF_RESULT_GRACE = float(os.environ.get("CV_PDF_RESULT_GRACE", 2))
+
+logger = logging.getLogger("cv_evaluator")
+
+# The format libraries (and the process pool machinery) are imported by the functions
+# that need them, so importing this module on an app cold start stays cheap
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process pool shared by every parallel extraction in this process"""
+    global _pool
+    from concurrent.futures import ProcessPoolExecutor
+
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=PDF_PROCESSES)
+        return _pool
+
+# Line separating the pages of extracted PDF text, so running headers and footers can be told apart
+PAGE_BREAK = "\f"
+
+def iter_pdf_pages(source, start=0, stop=None, deadline=None):
+    """Yield the text of each page in [start, stop) until the monotonic deadline passes"""
+    import PyPDF2
+
+    pdf_reader = source if isinstance(source, PyPDF2.PdfReader) else PyPDF2.PdfReader(source)
+    stop = len(pdf_reader.pages) if stop is None else min(stop, len(pdf_reader.pages))
+    for page_num in range(start, stop):
+        if deadline is not None and time.monotonic() > deadline:
+            logger.warning(f"PDF extraction stopped at page {page_num}: time budget exceeded")
+            return
+        yield pdf_reader.pages[page_num].extract_text() or ""
+
+def extract_page_range(data, start, stop, deadline=None):
+    """Text of pages [start, stop) of PDF bytes (runs in a worker process).
+
+    The deadline is checked between pages, so a task still running when the
+    budget runs out frees its worker instead of finishing the range.
+    """
+    return list(iter_pdf_pages(io.BytesIO(data), start, stop, deadline))
+
+def extract_pdf_text(data, max_pages=None, time_budget=None, parallel_pages=None, parallel=True):
+    """Extract the text of PDF bytes page by page within the page/time budget, joined once"""
+    max_pages = max_pages or PDF_MAX_PAGES
+    deadline = time.monotonic() + (time_budget or PDF_TIME_BUDGET)
+    import PyPDF2
+
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(data))
+    page_count = len(pdf_reader.pages)
+    if page_count > max_pages:
+        logger.warning(f"PDF has {page_count} pages; extracting the first {max_pages}")
+    pages = min(page_count, max_pages)
+
+    if not parallel or PDF_PROCESSES < 2 or pages < (parallel_pages or PDF_PARALLEL_PAGES):
+        return f"\n{PAGE_BREAK}\n".join(iter_pdf_pages(pdf_reader, 0, pages, deadline))
+
+    # One contiguous page range per process: each task re-parses the document structure
+    per_task = -(-pages // PDF_PROCESSES)
+    ranges = [(start, min(start + per_task, pages)) for start in range(0, pages, per_task)]
+    futures = [get_pool().submit(extract_page_range, data, start, stop, deadline) for start, stop in ranges]
+    chunks = []
+    for (start, stop), future in zip(ranges, futures):
+        try:
+            extracted = future.result(timeout=max(0, deadline + PDF_RESULT_GRACE - time.monotonic()))
+        except TimeoutError:
+            extracted = []
+        chunks.extend(extracted)
+        # Only the pages before the first one missing are kept: later ranges would leave a gap in the text
+        if len(extracted) < stop - start:
+            logger.warning(f"PDF extraction stopped after {len(chunks)} pages: time budget exceeded")
+            for pending in futures:
+                pending.cancel()
+            break
+    return f"\n{PAGE_BREAK}\n".join(chunks)
+
+def convert_pdf_bytes(data, parallel=True):
+    """Convert PDF bytes to text without touching the disk"""
+    return extract_pdf_text(data, parallel=parallel)
+
+# Signature of OLE2 compound files, the container of legacy .xls workbooks
+OLE2_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+def detect_format(data):
+    """Document format from its leading bytes: "pdf", "docx", "excel", "xls" or None"""
+    # Readers accept a PDF header anywhere in the first kilobyte
+    if b"%PDF-" in data[:1024]:
+        return "pdf"
+    if data[:8] == OLE2_SIGNATURE:
+        return "xls"
+    if data[:4] == b"PK\x03\x04":
+        import zipfile
+
+        # DOCX and XLSX are both zip packages; their part names tell them apart
+        try:
+            names = zipfile.ZipFile(io.BytesIO(data)).namelist()
+        except zipfile.BadZipFile:
+            return None
+        if any(name.startswith("word/") for name in names):
+            return "docx"
+        if any(name.startswith("xl/") for name in names):
+            return "excel"
+    return None
+
+def normalize_text(text):
+    """Same text shape for every format: Unix line breaks, no trailing spaces, at most one blank line in a row.
+
+    PDF page breaks are kept as lines of their own.
+    """
+    lines = [line if line == PAGE_BREAK else line.rstrip()
+             for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    normalized = []
+    for line in lines:
+        if line or (normalized and normalized[-1]):
+            normalized.append(line)
+    return "\n".join(normalized).strip()
+
+def docx_text(source):
+    """Paragraph text, then table rows, of a DOCX path or file-like object"""
+    import docx
+
+    doc = docx.Document(source)
+    lines = [paragraph.text for paragraph in doc.paragraphs]
+    # CV templates often lay sections out in tables
+    for table in doc.tables:
+        for row in table.rows:
+            lines.append(" | ".join(cell.text for cell in row.cells))
+    return "\n".join(lines)
+
+def iter_excel_rows(source, columns=None, sheet=None):
+    """Yield (row number, {column: value}) for each non-empty row of a sheet.
+
+    The workbook is opened read-only and rows are streamed, so memory stays
+    flat however many rows the sheet has. The first row holds the column
+    names; `columns` selects a subset of them.
+    """
+    import openpyxl
+
+    workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.active
+        rows = worksheet.iter_rows(values_only=True)
+        header = ["" if value is None else str(value).strip() for value in next(rows, ())]
+        if columns:
+            missing = [column for column in columns if column not in header]
+            if missing:
+                raise ValueError(f"Columns not found in sheet: {', '.join(missing)}")
+            indices = [header.index(column) for column in columns]
+        else:
+            indices = [i for i, name in enumerate(header) if name]
+        for row_number, row in enumerate(rows, 2):
+            record = {header[i]: row[i] for i in indices if i < len(row) and row[i] not in (None, "")}
+            if record:
+                yield row_number, record
+    finally:
+        workbook.close()
+
+def record_text(record):
+    """Text of one spreadsheet row: a "column: value" line per filled column"""
+    return normalize_text("\n".join(f"{column}: {value}" for column, value in record.items()))
+
+def excel_text(source):
+    """First sheet of an Excel path or file-like object as text, one block per row"""
+    return "\n\n".join(record_text(record) for _, record in iter_excel_rows(source))
+
+def xls_text(source):
+    """First sheet of a legacy .xls workbook as text, shaped like excel_text (read with pandas and xlrd)"""
+    import pandas as pd
+
+    frame = pd.read_excel(source, dtype=object)
+    # Columns without a name in the header row come back as "Unnamed: n"
+    columns = [column for column in frame.columns if not str(column).startswith("Unnamed:")]
+    blocks = []
+    for row in frame[columns].to_dict("records"):
+        record = {str(column).strip(): value for column, value in row.items() if not pd.isna(value) and value != ""}
+        if record:
+            blocks.append(record_text(record))
+    return "\n\n".join(blocks)
+
+def read_bytes(data, file_type=None, parallel=True):
+    """Normalised text of an in-memory document; the format is detected from its bytes unless given"""
+    file_type = file_type or detect_format(data)
+    if file_type == 'pdf':
+        text = convert_pdf_bytes(data, parallel=parallel)
+    elif file_type == 'docx':
+        text = docx_text(io.BytesIO(data))
+    elif file_type == 'excel':
+        text = excel_text(io.BytesIO(data))
+    elif file_type == 'xls':
+        text = xls_text(io.BytesIO(data))
+    else:
+        raise ValueError("Unsupported document format (expected PDF, DOCX or Excel)")
+    return normalize_text(text)
 
 def read_pdf(file_path):
     """Extract text from PDF file"""
-    text = ""
     try:
         with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page_num in range(len(pdf_reader.pages)):
-                page = pdf_reader.pages[page_num]
-                text += page.extract_text()
-        return text
+            return read_bytes(file.read(), 'pdf')
     except Exception as e:
         print(f"Error reading PDF: {e}")
         return None
@@ -21,11 +219,7 @@ def read_pdf(file_path):
 def read_docx(file_path):
     """Extract text from DOCX file"""
     try:
-        doc = docx.Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+        return normalize_text(docx_text(file_path))
     except Exception as e:
         print(f"Error reading DOCX: {e}")
         return None
@@ -33,42 +227,19 @@ def read_docx(file_path):
 def read_excel(file_path):
     """Extract text from Excel file"""
     try:
-        df = pd.read_excel(file_path)
-        return df.to_string()
+        with open(file_path, 'rb') as file:
+            if file.read(len(OLE2_SIGNATURE)) == OLE2_SIGNATURE:
+                return normalize_text(xls_text(file_path))
+        return normalize_text(excel_text(file_path))
     except Exception as e:
         print(f"Error reading Excel: {e}")
         return None
 
 def read_document(file, file_type=None):
-    """Read document based on file type"""
-    if file_type is None:
-        # Try to determine file type from file name
-        file_name = file.name.lower()
-        if file_name.endswith('.pdf'):
-            file_type = 'pdf'
-        elif file_name.endswith('.docx'):
-            file_type = 'docx'
-        elif file_name.endswith('.xlsx') or file_name.endswith('.xls'):
-            file_type = 'excel'
-        else:
-            return None
-    
-    # Save uploaded file to temporary location
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_type}') as temp_file:
-        temp_file.write(file.read())
-        temp_file_path = temp_file.name
-    
-    # Read file based on type
-    if file_type == 'pdf':
-        text = read_pdf(temp_file_path)
-    elif file_type == 'docx':
-        text = read_docx(temp_file_path)
-    elif file_type == 'excel':
-        text = read_excel(temp_file_path)
-    else:
-        text = None
-    
-    # Clean up temporary file
-    os.unlink(temp_file_path)
-    
-    return text
\ No newline at end of file
+    """Read an uploaded or opened document in memory; the format is detected from its content"""
+    try:
+        data = file.getvalue() if hasattr(file, "getvalue") else file.read()
+        return read_bytes(data, file_type)
+    except Exception as e:
+        print(f"Error reading document: {e}")
+        return None
@@ -0,0 +1,940 @@
+import contextvars
+import functools
+import json
+import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv_sections
+import local_checks
+import metrics
+import model_backends
+import model_routing
+import prompt_compaction
+import rate_limiter
+import response_parser
+import result_cache
+import scoring
+import streaming_json
+
+
+logger = logging.getLogger("cv_evaluator")
+
+MODEL_NAME = 'gemini-2.0-flash-thinking-exp-01-21'
+
+_backend = None
+_backend_settings = None
+_backend_lock = threading.Lock()
+
+# Function to configure the model backend. `backend` is a backend object or a name from
+# model_backends.BACKENDS (default: CV_MODEL_BACKEND, then "gemini", which falls back to
+# the GEMINI_API_KEY environment variable when no api_key is given). Named backends are
+# created on first use, and configuring again with the same settings keeps the existing
+# client, so Streamlit reruns do not rebuild it.
+def configure(api_key=None, backend=None):
+    global _backend, _backend_settings
+    with _backend_lock:
+        if backend is not None and not isinstance(backend, str):
+            _backend, _backend_settings = backend, None
+        elif (backend, api_key) != _backend_settings:
+            _backend, _backend_settings = None, (backend, api_key)
+
+def get_backend():
+    global _backend, _backend_settings
+    with _backend_lock:
+        if _backend is None:
+            name, api_key = _backend_settings or (None, None)
+            _backend = model_backends.create_backend(name, api_key=api_key)
+            _backend_settings = (name, api_key)
+        return _backend
+
+# Agent prompts
+AGENT_PROMPTS = {
+    "format_ats": """
+Instruksi: Anda adalah seorang ahli rekrutmen yang berpengalaman dan memahami sistem Applicant Tracking System (ATS). 
+Berkas CV : {cv_text}
+Evaluasi CV yang diberikan berdasarkan kriteria format dan ATS-friendliness berikut:
+
+1.  **Tata Letak (Bobot: 15):** Apakah tata letak CV bersih, terstruktur, dan mudah dipindai? Apakah menggunakan satu atau dua kolom? Hindari tata letak yang terlalu kompleks dengan grafik atau tabel yang berlebihan. Berikan penilaian (Baik/Cukup/Kurang) dan alasannya.
+2.  **Jenis dan Ukuran Font (Bobot: 10):** Apakah font yang digunakan adalah font standar yang mudah dibaca oleh manusia dan ATS (misalnya, Arial, Calibri, Times New Roman)? Apakah ukuran font sesuai (11-12 pt untuk teks, 14-16 pt untuk judul)? Berikan penilaian (Baik/Cukup/Kurang) dan alasannya.
+3.  **Penggunaan Header dan Footer (Bobot: 5):** Apakah CV menghindari penggunaan header dan footer untuk informasi penting (seperti informasi kontak)? Berikan penilaian (Ya/Tidak) dan alasannya.
+4.  **Penggunaan Grafik, Tabel, dan Gambar (Bobot: 5):** Apakah CV menghindari penggunaan grafik, tabel, atau gambar yang tidak perlu yang dapat membingungkan ATS? Berikan penilaian (Ya/Tidak) dan alasannya.
+
+Berikan ringkasan singkat mengenai tingkat ATS-friendliness CV ini dan saran perbaikan jika ada.
+
+Berikan juga skor untuk setiap kriteria dan total skor (dari 35 poin maksimal).
+
+Berikan output dalam format JSON dengan struktur berikut:
+{
+  "tata_letak": {"score": 0, "max": 15, "penilaian": "", "alasan": ""},
+  "font": {"score": 0, "max": 10, "penilaian": "", "alasan": ""},
+  "header_footer": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+  "grafik_tabel": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+  "total_score": 0,
+  "max_score": 35,
+  "ringkasan": "",
+  "saran_perbaikan": []
+}
+""",
+
+    "contact_summary": """
+Instruksi: Anda adalah seorang profesional HR yang sedang meninjau CV seorang kandidat. 
+Berkas CV : {cv_text}
+Evaluasi bagian ringkasan profesional/tujuan karir berdasarkan kriteria berikut:
+
+1.  **Ringkasan Profesional/Tujuan Karir (Bobot: 20):**
+    *   Apakah terdapat ringkasan profesional (untuk yang berpengalaman) atau tujuan karir (untuk fresh graduate/pindah karir)? Berikan penilaian (Ada/Tidak Ada).
+    *   Apakah ringkasan/tujuan tersebut ringkas (3-5 kalimat) dan fokus pada kualifikasi/tujuan yang relevan dengan pekerjaan yang dilamar? Berikan penilaian (Baik/Cukup/Kurang) dan alasannya.
+    *   Apakah ringkasan/tujuan menggunakan kata kunci yang relevan dari deskripsi pekerjaan (jika ada)? Berikan penilaian (Ya/Tidak) dan berikan contoh jika ada.
+    *   Apakah ringkasan/tujuan terdengar percaya diri dan profesional? Berikan penilaian (Ya/Tidak) dan alasannya.
+
+Berikan ringkasan singkat mengenai kualitas bagian ringkasan profesional/tujuan karir ini dan saran perbaikan jika ada.
+
+Berikan juga skor untuk setiap kriteria dan total skor (dari 20 poin maksimal).
+
+Berikan output dalam format JSON dengan struktur berikut:
+{
+  "ringkasan_profesional": {
+    "keberadaan": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "keringkasan": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "kata_kunci": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "kepercayaan_diri": {"score": 0, "max": 5, "penilaian": "", "alasan": ""}
+  },
+  "total_score": 0,
+  "max_score": 20,
+  "ringkasan": "",
+  "saran_perbaikan": []
+}
+""",
+
+    "work_experience": """
+Instruksi: Anda adalah seorang manajer perekrutan yang sedang mencari kandidat dengan pengalaman yang relevan. 
+Berkas CV : {cv_text}
+Evaluasi bagian pengalaman kerja dalam CV ini berdasarkan kriteria berikut:
+
+1.  **Urutan Kronologis (Bobot: 5):** Apakah pengalaman kerja dicantumkan dalam urutan kronologis terbalik (terbaru di atas)? Berikan penilaian (Ya/Tidak).
+2.  **Detail Setiap Pengalaman (Bobot: 10):** Untuk setiap pengalaman kerja, apakah jabatan pekerjaan, nama perusahaan, lokasi, dan tanggal bekerja tercantum dengan jelas? Berikan penilaian (Lengkap/Kurang Lengkap) dan sebutkan detail yang mungkin hilang.
+3.  **Deskripsi Tanggung Jawab dan Pencapaian (Bobot: 30):**
+    *   Apakah deskripsi menggunakan bullet points yang ringkas dan mudah dibaca? Berikan penilaian (Ya/Tidak).
+    *   Apakah deskripsi lebih fokus pada pencapaian dan kontribusi daripada hanya daftar tugas? Berikan penilaian (Ya/Tidak) dan berikan contoh jika ada.
+    *   Apakah deskripsi menggunakan kata kerja tindakan yang kuat di awal setiap bullet point (misalnya, Mengelola, Mengembangkan, Memimpin)? Berikan penilaian (Ya/Tidak) dan berikan contoh kata kerja yang digunakan.
+    *   Apakah pencapaian dikuantifikasi sebisa mungkin menggunakan angka, persentase, atau data? Berikan penilaian (Ya/Tidak) dan berikan contoh jika ada.
+    *   Apakah deskripsi pengalaman kerja relevan dengan jenis pekerjaan yang umumnya dilamar (berdasarkan informasi lain dalam CV)? Berikan penilaian (Sangat Relevan/Cukup Relevan/Kurang Relevan) dan alasannya.
+4.  **Gaya Bahasa (Bobot: 10):** Apakah gaya bahasa yang digunakan profesional, spesifik, dan tidak bertele-tele? Hindari penggunaan kata ganti orang pertama (saya, aku). Berikan penilaian (Baik/Cukup/Kurang) dan alasannya.
+
+Berikan ringkasan singkat mengenai kualitas bagian pengalaman kerja ini dan saran perbaikan jika ada.
+
+Berikan juga skor untuk setiap kriteria dan total skor (dari 55 poin maksimal).
+
+Berikan output dalam format JSON dengan struktur berikut:
+{
+  "urutan_kronologis": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+  "detail_pengalaman": {"score": 0, "max": 10, "penilaian": "", "alasan": ""},
+  "deskripsi_tanggung_jawab": {
+    "bullet_points": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "fokus_pencapaian": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "kata_kerja_tindakan": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "kuantifikasi": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+    "relevansi": {"score": 0, "max": 10, "penilaian": "", "alasan": ""}
+  },
+  "gaya_bahasa": {"score": 0, "max": 10, "penilaian": "", "alasan": ""},
+  "total_score": 0,
+  "max_score": 55,
+  "ringkasan": "",
+  "saran_perbaikan": []
+}
+""",
+
+    "education_skills": """
+Instruksi: Anda adalah seorang HR generalist yang sedang meninjau kualifikasi pendidikan dan keterampilan seorang kandidat. 
+Berkas CV : {cv_text}
+Evaluasi bagian pendidikan dan keterampilan dalam CV ini berdasarkan kriteria berikut:
+
+1.  **Pendidikan (Bobot: 10):**
+    *   Apakah riwayat pendidikan dicantumkan dalam urutan kronologis terbalik? Berikan penilaian (Ya/Tidak).
+    *   Apakah detail penting seperti nama gelar, jurusan, nama universitas, dan tanggal kelulusan (atau perkiraan) tercantum? Berikan penilaian (Lengkap/Kurang Lengkap) dan sebutkan detail yang mungkin hilang.
+    *   Apakah ada informasi relevan lainnya seperti penghargaan akademik atau mata kuliah yang relevan (terutama untuk fresh graduate)? Sebutkan jika ada.
+2.  **Keterampilan (Bobot: 20):**
+    *   Apakah terdapat bagian khusus untuk keterampilan? Berikan penilaian (Ya/Tidak).
+    *   Apakah keterampilan dibagi menjadi keterampilan teknis (*hard skills*) dan keterampilan interpersonal (*soft skills*) (opsional, tapi baik)? Sebutkan jika ada.
+    *   Apakah keterampilan yang dicantumkan relevan dengan jenis pekerjaan yang umumnya dilamar? Berikan penilaian (Sangat Relevan/Cukup Relevan/Kurang Relevan) dan berikan contoh keterampilan yang relevan.
+    *   Apakah ada indikasi tingkat kemahiran untuk keterampilan tertentu (misalnya, "Mahir dalam Python", "Familiar dengan Microsoft Excel")? Sebutkan jika ada.
+    *   Apakah kata kunci dari deskripsi pekerjaan (jika ada) tercantum di bagian keterampilan? Berikan contoh jika ada.
+
+Berikan ringkasan singkat mengenai kualitas bagian pendidikan dan keterampilan ini dan saran perbaikan jika ada.
+
+Berikan juga skor untuk setiap kriteria dan total skor (dari 30 poin maksimal).
+
+Berikan output dalam format JSON dengan struktur berikut:
+{
+  "pendidikan": {
+    "urutan_kronologis": {"score": 0, "max": 2, "penilaian": "", "alasan": ""},
+    "detail_penting": {"score": 0, "max": 6, "penilaian": "", "alasan": ""},
+    "informasi_tambahan": {"score": 0, "max": 2, "penilaian": "", "alasan": ""}
+  },
+  "keterampilan": {
+    "bagian_khusus": {"score": 0, "max": 4, "penilaian": "", "alasan": ""},
+    "pembagian_kategori": {"score": 0, "max": 4, "penilaian": "", "alasan": ""},
+    "relevansi": {"score": 0, "max": 6, "penilaian": "", "alasan": ""},
+    "tingkat_kemahiran": {"score": 0, "max": 3, "penilaian": "", "alasan": ""},
+    "kata_kunci": {"score": 0, "max": 3, "penilaian": "", "alasan": ""}
+  },
+  "total_score": 0,
+  "max_score": 30,
+  "ringkasan": "",
+  "saran_perbaikan": []
+}
+""",
+
+    "optional_mistakes": """
+Instruksi: Anda adalah seorang perekrut yang sedang melakukan pemeriksaan akhir pada CV seorang kandidat. 
+Berkas CV : {cv_text}
+Evaluasi bagian opsional dan periksa kesalahan umum dalam CV ini berdasarkan kriteria berikut:
+
+1.  **Bagian Opsional (Bobot: 5):** Apakah terdapat bagian opsional yang relevan dan menambah nilai pada CV (misalnya, penghargaan, sertifikasi, proyek, pengalaman sukarela, bahasa)? Sebutkan jika ada dan berikan penilaian singkat mengenai relevansinya.
+2.  **Kesalahan Ketik dan Tata Bahasa (Bobot: 15):** Apakah CV bebas dari kesalahan ketik, ejaan, dan tata bahasa? Berikan penilaian (Bebas Kesalahan/Terdapat Beberapa Kesalahan/Banyak Kesalahan) dan sebutkan contoh kesalahan jika ditemukan.
+3.  **Informasi yang Tidak Relevan (Bobot: 5):** Apakah terdapat informasi yang tidak relevan dengan pekerjaan yang dilamar (misalnya, hobi yang tidak terkait, informasi pribadi yang berlebihan)? Sebutkan jika ada.
+4.  **Ketidakjujuran (Bobot: -50 - Penalti Besar):** Berdasarkan informasi yang diberikan, apakah ada indikasi potensi ketidakjujuran atau informasi yang dilebih-lebihkan? (Ini mungkin sulit dinilai tanpa informasi eksternal, fokus pada inkonsistensi internal jika ada). Berikan penilaian (Tidak Ada Indikasi/Potensi Ada Indikasi) dan alasannya jika ada.
+5.  **Panjang CV (Bobot: 5):** Apakah panjang CV sesuai (idealnya 1-2 halaman, tergantung pengalaman)? Berikan penilaian (Sesuai/Terlalu Pendek/Terlalu Panjang) dan alasannya.
+
+Berikan ringkasan singkat mengenai kualitas bagian opsional dan identifikasi kesalahan umum dalam CV ini, serta saran perbaikan jika ada.
+
+Berikan juga skor untuk setiap kriteria dan total skor (dari 30 poin maksimal, dengan potensi penalti hingga -50 untuk ketidakjujuran).
+
+Berikan output dalam format JSON dengan struktur berikut:
+{
+  "bagian_opsional": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+  "kesalahan_ketik": {"score": 0, "max": 15, "penilaian": "", "alasan": ""},
+  "informasi_tidak_relevan": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+  "ketidakjujuran": {"score": 0, "min": -50, "penilaian": "", "alasan": ""},
+  "panjang_cv": {"score": 0, "max": 5, "penilaian": "", "alasan": ""},
+  "total_score": 0,
+  "max_score": 30,
+  "ringkasan": "",
+  "saran_perbaikan": []
+}
+""",
+
+    "coordinator": """
+Anda adalah koordinator yang bertugas menyimpulkan hasil evaluasi dari beberapa agen yang telah menganalisis CV seorang kandidat. Berikut adalah hasil evaluasi dari lima agen berbeda:
+
+1. Evaluasi Format dan ATS Friendliness: {format_ats_result}
+2. Evaluasi Informasi Kontak dan Ringkasan Profesional: {contact_summary_result}
+3. Evaluasi Pengalaman Kerja: {work_experience_result}
+4. Evaluasi Pendidikan dan Keterampilan: {education_skills_result}
+5. Evaluasi Bagian Opsional dan Kesalahan Umum: {optional_mistakes_result}
+
+Skor keseluruhan CV sudah dihitung: {total_score}/100 ({kategori}). Jangan menghitung ulang skor.
+
+Berdasarkan hasil evaluasi di atas, buatlah ringkasan komprehensif yang mencakup:
+
+1. Kekuatan utama CV (3-5 poin)
+2. Kekurangan utama yang perlu diperbaiki (3-5 poin)
+3. Saran perbaikan yang konkret dan spesifik (5-7 poin)
+
+Berikan output dalam format JSON dengan struktur berikut:
+{{
+  "kekuatan": [],
+  "kekurangan": [],
+  "saran_perbaikan": []
+}}
+"""
+}
+
+# Expected JSON structure of every prompt's answer, taken from the prompt itself
+RESPONSE_SCHEMAS = {name: response_parser.schema_from_prompt(prompt) for name, prompt in AGENT_PROMPTS.items()}
+
+# Function to take the keyword criteria (rubric question and output field) out of an agent prompt
+def without_keyword_criteria(prompt):
+    lines = [line for line in prompt.split("\n")
+             if not (line.lstrip().startswith("*") and "kata kunci" in line.lower()) and '"kata_kunci"' not in line]
+    # The field before a removed last field keeps a trailing comma
+    return re.sub(r",(\s*\})", r"\1", "\n".join(lines))
+
+# Agent prompts used when a job description is given: the keyword criteria are then
+# scored locally against it (see local_checks.KEYWORD_CRITERIA), so the model is not asked
+KEYWORD_PROMPTS = {name: without_keyword_criteria(AGENT_PROMPTS[name]) for name in local_checks.KEYWORD_CRITERIA}
+
+# Function to pick an agent's prompt template for an evaluation with or without a job description
+def prompt_for(agent_name, job_description=None):
+    if job_description and agent_name in KEYWORD_PROMPTS:
+        return KEYWORD_PROMPTS[agent_name]
+    return AGENT_PROMPTS[agent_name]
+
+# Function to read the expected answer structure of a prompt template, once per template
+@functools.lru_cache(maxsize=None)
+def response_schema(prompt):
+    return response_parser.schema_from_prompt(prompt)
+
+# Function to split a prompt template around its {cv_text} placeholder, once per template
+@functools.lru_cache(maxsize=None)
+def compile_prompt(prompt):
+    head, _, tail = prompt.partition("{cv_text}")
+    return head, tail
+
+# Function to fill a prompt template with the CV text without rescanning the template
+def render_prompt(prompt, cv_text):
+    head, tail = compile_prompt(prompt)
+    return head + cv_text + tail
+
+# Fields computed locally from the criteria, never re-requested from the model
+COMPUTED_FIELDS = ("total_score", "max_score")
+
+# Follow-up requests for fields an answer left out or got wrong
+MAX_FIELD_REQUESTS = 1
+
+MISSING_FIELDS_PROMPT = """
+
+Jawaban sebelumnya tidak lengkap atau tidak valid. Berikan HANYA bagian JSON berikut, dengan struktur persis seperti ini:
+{fields}
+"""
+
+# Function to parse an agent's JSON answer out of the raw response text, repairing
+# trailing commas, truncation and surrounding prose; None if nothing usable is found
+def parse_agent_response(agent_name, response_text):
+    with metrics.span(f"parse.{agent_name}"):
+        try:
+            result, repaired = response_parser.parse_json_response(response_text)
+        except response_parser.ResponseParseError as e:
+            metrics.set_outcome("invalid_json")
+            logger.error(f"Could not parse JSON from {agent_name} response: {e}")
+            logger.debug(response_text)
+            return None
+        if repaired:
+            metrics.set_outcome("repaired")
+        return result
+
+# Function to compute an agent's total from its criteria, as a whole number when possible
+def agent_total(result):
+    points = scoring.agent_points(result)
+    return int(points) if points.is_integer() else points
+
+# Function to check an agent answer against its schema (by default the one of its full prompt):
+# (normalised result, missing field paths)
+def validate_agent_result(agent_name, result, schema=None):
+    result, missing = response_parser.validate(result or {}, schema or RESPONSE_SCHEMAS[agent_name])
+    return result, [path for path in missing if path not in COMPUTED_FIELDS]
+
+# Function to turn a validated answer into a displayable result: remaining fields get their
+# empty defaults and the totals are recomputed. None if no criterion was scored at all.
+def finalize_agent_result(agent_name, result, schema=None):
+    if not response_parser.has_criteria(result):
+        return None
+    schema = schema or RESPONSE_SCHEMAS[agent_name]
+    result = response_parser.fill_defaults(result, schema)
+    result["total_score"] = agent_total(result)
+    result["max_score"] = schema["max_score"]
+    return result
+
+# Function to validate an agent answer and re-request only the fields it is missing from
+# the model that gave it. Returns (result or None, paths still missing).
+def complete_agent_result(agent_name, agent_prompt, result, span, model_name=None, max_requests=MAX_FIELD_REQUESTS,
+                          schema=None):
+    schema = schema or RESPONSE_SCHEMAS[agent_name]
+    result, missing = validate_agent_result(agent_name, result, schema)
+    for _ in range(max_requests):
+        if not missing:
+            break
+        logger.warning(f"{agent_name} answer is missing {', '.join(missing)}; requesting those fields again")
+        fields = response_parser.subset_template(schema, missing)
+        followup_prompt = agent_prompt + MISSING_FIELDS_PROMPT.replace(
+            "{fields}", json.dumps(fields, ensure_ascii=False, indent=2)
+        )
+        try:
+            response_text = rate_limiter.get_limiter().call(
+                get_backend().generate, followup_prompt, model_name or MODEL_NAME,
+                estimated_tokens=rate_limiter.estimate_tokens(followup_prompt)
+            )
+        except Exception as e:
+            logger.error(f"Error re-requesting fields from {agent_name}: {e}")
+            break
+        update = response_parser.pick(parse_agent_response(agent_name, response_text) or {}, missing)
+        result, missing = validate_agent_result(agent_name, response_parser.merge(result, update), schema)
+        span.outcome = "refetched"
+    if missing:
+        span.outcome = "incomplete"
+    return finalize_agent_result(agent_name, result, schema), missing
+
+# Function to check one model's agent answer under tiered routing: (result, missing, escalation
+# reason or None). A fast-model answer is not sent back for missing fields, since an invalid
+# answer is escalated to the strong model anyway.
+def check_agent_answer(agent_name, agent_prompt, parsed, span, model_name, started, schema=None):
+    final = model_name == MODEL_NAME
+    reported_total = parsed.get("total_score") if isinstance(parsed, dict) else None
+    result, missing = complete_agent_result(
+        agent_name, agent_prompt, parsed, span, model_name, MAX_FIELD_REQUESTS if final else 0, schema
+    )
+    reason = None if final else model_routing.escalation_reason(result, missing, reported_total)
+    model_routing.stats.record(agent_name, model_name, time.monotonic() - started, reason)
+    if reason:
+        logger.info(f"Escalating {agent_name} from {model_name} to {MODEL_NAME}: {reason}")
+        span.outcome = "escalated"
+    return result, missing, reason
+
+# Function to make one model call of a routed stage inside the rate limiter. A failed fast-model
+# call (unknown model, retries exhausted) returns None so the caller escalates to the strong model.
+def routed_call(stage, model_name, span, fn, *args, estimated_tokens=None):
+    started = time.monotonic()
+    try:
+        return rate_limiter.get_limiter().call(fn, *args, estimated_tokens=estimated_tokens)
+    except Exception as e:
+        if model_name == MODEL_NAME:
+            raise
+        logger.warning(f"Escalating {stage} from {model_name} to {MODEL_NAME}: {e}")
+        model_routing.stats.record(stage, model_name, time.monotonic() - started, "error")
+        span.outcome = "escalated"
+        return None
+
+# Function to run agent evaluation, on the fast model first when routing is tiered.
+# `answered` (agent_name -> model), if given, records which model's answer was kept;
+# `escalate` redoes the agent on the strong model alone and replaces its cached result.
+def run_agent(agent_name, prompt, cv_text, answered=None, escalate=False):
+    with metrics.span(f"agent.{agent_name}") as span:
+        cache = result_cache.get_cache()
+        key = result_cache.cache_key(cv_text, agent_name, prompt, model_routing.route_id(MODEL_NAME))
+        cached = None if escalate else cache.get(key)
+        if cached is not None:
+            span.outcome = "cache_hit"
+            return cached
+
+        try:
+            agent_prompt = render_prompt(prompt, cv_text)
+            span.prompt_tokens = rate_limiter.estimate_tokens(agent_prompt)
+            result = None
+            for model_name in [MODEL_NAME] if escalate else model_routing.models(MODEL_NAME):
+                started = time.monotonic()
+                response_text = routed_call(
+                    agent_name, model_name, span, get_backend().generate, agent_prompt, model_name,
+                    estimated_tokens=span.prompt_tokens
+                )
+                if response_text is None:
+                    continue
+                span.response_tokens = rate_limiter.estimate_tokens(response_text)
+                parsed = parse_agent_response(agent_name, response_text)
+                result, missing, reason = check_agent_answer(
+                    agent_name, agent_prompt, parsed, span, model_name, started, response_schema(prompt)
+                )
+                if reason is None:
+                    if answered is not None:
+                        answered[agent_name] = model_name
+                    break
+
+            if result is None:
+                span.outcome = "parse_failed"
+            elif not missing:
+                cache.set(key, result)
+            return result
+                
+        except Exception as e:
+            span.outcome = "error"
+            logger.error(f"Error running {agent_name}: {e}")
+            return None
+
+# Function to run agent evaluation with a streamed response;
+# on_field(key, value) is called as soon as each top-level field of the JSON answer is complete
+def run_agent_streaming(agent_name, prompt, cv_text, on_field, answered=None):
+    with metrics.span(f"agent.{agent_name}") as span:
+        cache = result_cache.get_cache()
+        key = result_cache.cache_key(cv_text, agent_name, prompt, model_routing.route_id(MODEL_NAME))
+        cached = cache.get(key)
+        if cached is not None:
+            span.outcome = "cache_hit"
+            for field, value in cached.items():
+                on_field(field, value)
+            return cached
+
+        try:
+            agent_prompt = render_prompt(prompt, cv_text)
+            span.prompt_tokens = rate_limiter.estimate_tokens(agent_prompt)
+
+            # Consume the whole stream inside the limiter so a throttled stream is retried.
+            # An escalated answer streams again and its fields replace the fast model's.
+            def stream(model_name):
+                parser = streaming_json.IncrementalObjectParser()
+                for chunk in get_backend().generate_stream(agent_prompt, model_name):
+                    for field, value in parser.feed(chunk):
+                        on_field(field, value)
+                return parser
+
+            result = None
+            for model_name in model_routing.models(MODEL_NAME):
+                started = time.monotonic()
+                parser = routed_call(agent_name, model_name, span, stream, model_name, estimated_tokens=span.prompt_tokens)
+                if parser is None:
+                    continue
+                span.response_tokens = rate_limiter.estimate_tokens(parser.buffer)
+
+                # Fall back to whole-response parsing if the stream was not one clean object
+                parsed = parser.result()
+                if parsed is None:
+                    parsed = parse_agent_response(agent_name, parser.buffer)
+                result, missing, reason = check_agent_answer(
+                    agent_name, agent_prompt, parsed, span, model_name, started, response_schema(prompt)
+                )
+                if reason is None:
+                    if answered is not None:
+                        answered[agent_name] = model_name
+                    break
+
+            if result is None:
+                span.outcome = "parse_failed"
+            elif not missing:
+                cache.set(key, result)
+            return result
+
+        except Exception as e:
+            span.outcome = "error"
+            logger.error(f"Error running {agent_name}: {e}")
+            return None
+
+# Evaluation agents in display order, with their human-readable labels
+AGENT_LABELS = {
+    "format_ats": "Format & ATS",
+    "contact_summary": "Contact & Summary",
+    "work_experience": "Work Experience",
+    "education_skills": "Education & Skills",
+    "optional_mistakes": "Optional Sections & Mistakes",
+}
+
+# Criteria rows of each agent's result in display order: (label, dotted path to the criterion)
+AGENT_CRITERIA = {
+    "format_ats": [
+        ("Format File", "format_file"),
+        ("Tata Letak", "tata_letak"),
+        ("Font", "font"),
+        ("Bullet Points", "bullet_points"),
+        ("Header & Footer", "header_footer"),
+        ("Grafik & Tabel", "grafik_tabel"),
+        ("Konsistensi", "konsistensi"),
+    ],
+    "contact_summary": [
+        ("Informasi Kontak", "informasi_kontak"),
+        ("Alamat Email", "alamat_email"),
+        ("Ringkasan - Keberadaan", "ringkasan_profesional.keberadaan"),
+        ("Ringkasan - Keringkasan", "ringkasan_profesional.keringkasan"),
+        ("Ringkasan - Kata Kunci", "ringkasan_profesional.kata_kunci"),
+        ("Ringkasan - Kepercayaan Diri", "ringkasan_profesional.kepercayaan_diri"),
+    ],
+    "work_experience": [
+        ("Urutan Kronologis", "urutan_kronologis"),
+        ("Detail Pengalaman", "detail_pengalaman"),
+        ("Deskripsi - Bullet Points", "deskripsi_tanggung_jawab.bullet_points"),
+        ("Deskripsi - Fokus Pencapaian", "deskripsi_tanggung_jawab.fokus_pencapaian"),
+        ("Deskripsi - Kata Kerja Tindakan", "deskripsi_tanggung_jawab.kata_kerja_tindakan"),
+        ("Deskripsi - Kuantifikasi", "deskripsi_tanggung_jawab.kuantifikasi"),
+        ("Deskripsi - Relevansi", "deskripsi_tanggung_jawab.relevansi"),
+        ("Gaya Bahasa", "gaya_bahasa"),
+    ],
+    "education_skills": [
+        ("Pendidikan - Urutan Kronologis", "pendidikan.urutan_kronologis"),
+        ("Pendidikan - Detail Penting", "pendidikan.detail_penting"),
+        ("Pendidikan - Informasi Tambahan", "pendidikan.informasi_tambahan"),
+        ("Keterampilan - Bagian Khusus", "keterampilan.bagian_khusus"),
+        ("Keterampilan - Pembagian Kategori", "keterampilan.pembagian_kategori"),
+        ("Keterampilan - Relevansi", "keterampilan.relevansi"),
+        ("Keterampilan - Tingkat Kemahiran", "keterampilan.tingkat_kemahiran"),
+        ("Keterampilan - Kata Kunci", "keterampilan.kata_kunci"),
+    ],
+    "optional_mistakes": [
+        ("Bagian Opsional", "bagian_opsional"),
+        ("Kesalahan Ketik", "kesalahan_ketik"),
+        ("Informasi Tidak Relevan", "informasi_tidak_relevan"),
+        ("Ketidakjujuran", "ketidakjujuran"),
+        ("Panjang CV", "panjang_cv"),
+    ],
+}
+
+# Function to look up a criterion by its dotted path; None if (not yet) present
+def get_criterion(result, path):
+    node = result
+    for key in path.split("."):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node if isinstance(node, dict) else None
+
+# CV sections each agent needs; None means the agent judges the whole document
+# (layout, typos and length can only be assessed on the full text)
+AGENT_SECTIONS = {
+    "format_ats": None,
+    "contact_summary": ["summary"],
+    "work_experience": ["summary", "experience", "skills"],
+    "education_skills": ["education", "skills"],
+    "optional_mistakes": None,
+}
+
+SECTION_LABELS = {
+    "contact": "Informasi Kontak",
+    "summary": "Ringkasan Profesional",
+    "experience": "Pengalaman Kerja",
+    "education": "Pendidikan",
+    "skills": "Keterampilan",
+    "optional": "Bagian Opsional",
+}
+
+# Send each agent only its relevant CV sections instead of the full text
+SECTION_SLICING = True
+
+# Compact the CV text sent to the model (whitespace, page furniture, duplicate lines, length cap);
+# rule-based checks and revision diffs keep reading the extracted text
+COMPACT_CV_TEXT = True
+
+# Function to compact the CV text once per evaluation and record the token reduction
+def model_text(cv_text):
+    if not COMPACT_CV_TEXT:
+        return cv_text
+    with metrics.span("compact") as span:
+        text, report = prompt_compaction.compact(cv_text)
+        span.prompt_tokens = report["tokens_after"]
+        if report["truncated"]:
+            span.outcome = "truncated"
+        logger.info(f"CV text compacted from {report['tokens_before']} to {report['tokens_after']} tokens "
+                    f"({report['reduction']:.0%} fewer, {report['lines_removed']} lines removed)")
+    return text
+
+# Function to build the CV text sent to one agent
+def agent_input(agent_name, cv_text, found_sections=None):
+    sections = AGENT_SECTIONS.get(agent_name)
+    if not SECTION_SLICING or sections is None:
+        return cv_text
+    labels = [SECTION_LABELS[section] for section in sections]
+    return cv_sections.slice_for(cv_text, sections, labels, found=found_sections)
+
+# Function to merge the locally scored criteria into an agent's model result; the totals
+# are recomputed since the model only scored its own criteria
+def with_local_scores(agent_name, result, local_scores):
+    if result is None or agent_name not in local_scores:
+        return result
+    merged = response_parser.merge(result, local_scores[agent_name])
+    merged["total_score"] = agent_total(merged)
+    merged["max_score"] = scoring.AGENT_MAX_SCORES[agent_name]
+    return merged
+
+# Maximum number of agents dispatched at the same time; the shared rate limiter
+# decides how many of them actually reach the model concurrently
+MAX_PARALLEL_AGENTS = 5
+
+# Function to list the agents whose input differs between two versions of a CV. Sections are
+# compared ignoring whitespace; agents that read the whole text are affected by any change.
+def affected_agents(previous_text, cv_text):
+    found = cv_sections.split_sections(cv_text)
+    old = {section: " ".join(text.split()) for section, text in cv_sections.split_sections(previous_text).items()}
+    new = {section: " ".join(text.split()) for section, text in found.items()}
+    changed = {section for section in old.keys() | new.keys() if old.get(section) != new.get(section)}
+    if not changed:
+        return []
+
+    affected = []
+    for agent_name in AGENT_LABELS:
+        sections = AGENT_SECTIONS.get(agent_name)
+        # Without any of its sections an agent is sent the full text (see cv_sections.slice_for)
+        if not SECTION_SLICING or sections is None or not any(section in found for section in sections):
+            affected.append(agent_name)
+        elif changed & {"header", *sections}:
+            affected.append(agent_name)
+    return affected
+
+# Function to run all evaluation agents concurrently. Callbacks are always invoked from the
+# calling thread: on_complete(agent_name, completed, result) as each agent finishes and, in streaming
+# mode, on_field(agent_name, key, value) as each field of an agent's answer arrives.
+# thread_initializer runs in every worker thread before it picks up an agent.
+# Agents in `reuse` (agent_name -> earlier result) are not run again.
+def run_agents(cv_text, on_complete=None, thread_initializer=None, on_field=None, reuse=None, job_description=None):
+    results = {}
+    events = queue.Queue()
+    found_sections = cv_sections.split_sections(cv_text)
+    local_scores = local_checks.run_checks(cv_text, found_sections, job_description)
+    # Rule-based criteria are known before any model call returns
+    if on_field:
+        for agent_name, criteria in local_scores.items():
+            for key, value in criteria.items():
+                on_field(agent_name, key, value)
+    reuse = {agent_name: result for agent_name, result in (reuse or {}).items() if result is not None}
+    for agent_name, result in reuse.items():
+        with metrics.span(f"agent.{agent_name}") as span:
+            span.outcome = "reused"
+        # Local criteria are re-scored on the new text
+        results[agent_name] = with_local_scores(agent_name, result, local_scores)
+        if on_complete:
+            on_complete(agent_name, len(results), results[agent_name])
+
+    if len(reuse) < len(AGENT_LABELS):
+        prompt_text = model_text(cv_text)
+        prompt_sections = found_sections if prompt_text == cv_text else cv_sections.split_sections(prompt_text)
+
+    inputs = {}
+    answered = {}
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_AGENTS, initializer=thread_initializer) as executor:
+        for agent_name in AGENT_LABELS:
+            if agent_name in reuse:
+                continue
+            inputs[agent_name] = (prompt_for(agent_name, job_description), agent_input(agent_name, prompt_text, prompt_sections))
+            args = (agent_name, *inputs[agent_name])
+            # Each task runs in a copy of the caller's context so metrics traces follow it
+            context = contextvars.copy_context()
+            if on_field:
+                report = lambda key, value, agent_name=agent_name: events.put(("field", agent_name, (key, value)))
+                future = executor.submit(context.run, run_agent_streaming, *args, report, answered)
+            else:
+                future = executor.submit(context.run, run_agent, *args, answered)
+            future.add_done_callback(lambda f, agent_name=agent_name: events.put(("done", agent_name, f)))
+
+        while len(results) < len(AGENT_LABELS):
+            kind, agent_name, payload = events.get()
+            if kind == "field":
+                on_field(agent_name, *payload)
+                continue
+            results[agent_name] = with_local_scores(agent_name, payload.result(), local_scores)
+            if on_complete:
+                on_complete(agent_name, len(results), results[agent_name])
+
+        # A few points decide the kategori of a borderline aggregate, so the fast model's
+        # answers are redone by the strong model
+        fast = [agent_name for agent_name, model_name in answered.items() if model_name != MODEL_NAME]
+        if fast and model_routing.borderline(scoring.aggregate_scores(results)["persentase"]):
+            logger.info(f"Aggregate score is borderline; escalating {', '.join(fast)} to {MODEL_NAME}")
+            futures = {}
+            for agent_name in fast:
+                model_routing.stats.escalate(agent_name, "borderline")
+                context = contextvars.copy_context()
+                futures[agent_name] = executor.submit(context.run, run_agent, agent_name, *inputs[agent_name], escalate=True)
+            for agent_name, future in futures.items():
+                result = future.result()
+                if result is not None:
+                    results[agent_name] = with_local_scores(agent_name, result, local_scores)
+                    if on_complete:
+                        on_complete(agent_name, len(results), results[agent_name])
+
+    # Keep the canonical agent order regardless of completion order
+    return {agent_name: results[agent_name] for agent_name in AGENT_LABELS}
+
+# Header and footer of the fused prompt; the rubrics in between come from AGENT_PROMPTS
+FUSED_PROMPT_HEADER = """
+Instruksi: Anda adalah tim rekrutmen berpengalaman yang memahami sistem Applicant Tracking System (ATS). Evaluasi CV berikut dari lima sudut pandang sekaligus.
+Berkas CV : {cv_text}
+"""
+
+FUSED_PROMPT_FOOTER = """
+Gabungkan hasil kelima bagian di atas menjadi SATU objek JSON dengan kunci {agent_keys}. Nilai setiap kunci adalah objek JSON bagian tersebut dengan struktur persis seperti yang diminta di bagiannya. Jangan menambahkan teks lain di luar JSON.
+"""
+
+# Function to build the single-call prompt that merges the five agent rubrics
+def build_fused_prompt(prompts=AGENT_PROMPTS):
+    parts = [FUSED_PROMPT_HEADER]
+    for number, agent_name in enumerate(AGENT_LABELS, 1):
+        # Everything after the CV placeholder is the agent's rubric and output schema
+        rubric = prompts[agent_name].split("{cv_text}", 1)[1].strip()
+        parts.append(f'### Bagian {number}: "{agent_name}" ({AGENT_LABELS[agent_name]})\n{rubric}\n')
+    agent_keys = ", ".join(f'"{agent_name}"' for agent_name in AGENT_LABELS)
+    parts.append(FUSED_PROMPT_FOOTER.replace("{agent_keys}", agent_keys))
+    return "\n".join(parts)
+
+FUSED_PROMPT = build_fused_prompt()
+FUSED_KEYWORD_PROMPT = build_fused_prompt({**AGENT_PROMPTS, **KEYWORD_PROMPTS})
+
+# Function to pick the fused prompt template for an evaluation with or without a job description
+def fused_prompt_for(job_description=None):
+    return FUSED_KEYWORD_PROMPT if job_description else FUSED_PROMPT
+
+# Function to evaluate all five rubrics with a single model call. The response is streamed,
+# so on_complete(agent_name, completed, result) fires as each agent's sub-object arrives.
+def run_fused(cv_text, on_complete=None, job_description=None):
+    cache = result_cache.get_cache()
+    local_scores = local_checks.run_checks(cv_text, job_description=job_description)
+    # The cache is keyed on the text the model actually reads
+    cv_text = model_text(cv_text)
+    prompts = {agent_name: prompt_for(agent_name, job_description) for agent_name in AGENT_LABELS}
+    schemas = {agent_name: response_schema(prompt) for agent_name, prompt in prompts.items()}
+    key = result_cache.cache_key(cv_text, "fused", fused_prompt_for(job_description), MODEL_NAME)
+    results = cache.get(key)
+    reported = []
+
+    if results is None:
+        results = {}
+        incomplete = []
+        with metrics.span("agent.fused") as span:
+            answer = {}
+            try:
+                fused_prompt = render_prompt(fused_prompt_for(job_description), cv_text)
+                span.prompt_tokens = rate_limiter.estimate_tokens(fused_prompt)
+
+                def stream():
+                    parser = streaming_json.IncrementalObjectParser()
+                    # A retried stream starts over
+                    reported.clear()
+                    results.clear()
+                    for chunk in get_backend().generate_stream(fused_prompt, MODEL_NAME):
+                        for agent_name, result in parser.feed(chunk):
+                            if agent_name not in AGENT_LABELS:
+                                continue
+                            # Only answers that pass validation are reported early
+                            result, missing = validate_agent_result(agent_name, result, schemas[agent_name])
+                            if not missing:
+                                results[agent_name] = finalize_agent_result(agent_name, result, schemas[agent_name])
+                                reported.append(agent_name)
+                                if on_complete:
+                                    on_complete(agent_name, len(reported), with_local_scores(agent_name, results[agent_name], local_scores))
+                    return parser
+
+                parser = rate_limiter.get_limiter().call(stream, estimated_tokens=span.prompt_tokens)
+                span.response_tokens = rate_limiter.estimate_tokens(parser.buffer)
+                answer = parser.result() or parse_agent_response("fused", parser.buffer) or {}
+            except Exception as e:
+                span.outcome = "error"
+                logger.error(f"Error running fused evaluation: {e}")
+
+            # Agents the fused answer left incomplete have only their missing fields
+            # re-requested; agents it left out entirely are run on their own
+            for agent_name in AGENT_LABELS:
+                if agent_name in results:
+                    continue
+                if isinstance(answer.get(agent_name), dict):
+                    agent_prompt = render_prompt(prompts[agent_name], cv_text)
+                    results[agent_name], missing = complete_agent_result(
+                        agent_name, agent_prompt, answer[agent_name], span, schema=schemas[agent_name]
+                    )
+                    if missing:
+                        incomplete.append(agent_name)
+                else:
+                    results[agent_name] = run_agent(agent_name, prompts[agent_name], agent_input(agent_name, cv_text))
+            if all(results.get(agent_name) for agent_name in AGENT_LABELS) and not incomplete:
+                cache.set(key, results)
+            elif span.outcome == "ok":
+                span.outcome = "incomplete"
+    else:
+        with metrics.span("agent.fused") as span:
+            span.outcome = "cache_hit"
+
+    # Agents missing from the answer come back as None, like a failed agent call
+    results = {agent_name: with_local_scores(agent_name, results.get(agent_name), local_scores) for agent_name in AGENT_LABELS}
+    for agent_name, result in results.items():
+        if agent_name not in reported:
+            reported.append(agent_name)
+            if on_complete:
+                on_complete(agent_name, len(reported), result)
+    return results
+
+# Evaluation engines selectable per run
+ENGINES = {
+    "agents": "Five specialised agents",
+    "fused": "Single fused call",
+}
+
+# Function to fingerprint what an agent result depends on besides the CV text: the prompt
+# template (which differs with a job description), the model or routing, and the engine
+# (the same inputs result_cache keys on)
+def result_fingerprint(agent_name, engine="agents", job_description=None):
+    if engine == "fused":
+        prompt, model_id = fused_prompt_for(job_description), MODEL_NAME
+    else:
+        prompt, model_id = prompt_for(agent_name, job_description), model_routing.route_id(MODEL_NAME)
+    return result_cache.text_hash("\x1f".join([agent_name, result_cache.template_hash(prompt), model_id, engine]))
+
+# Function to fingerprint a whole evaluation's results, for stores that keep all agents together
+def evaluation_fingerprint(engine="agents", job_description=None):
+    return result_cache.text_hash("\x1f".join(
+        result_fingerprint(agent_name, engine, job_description) for agent_name in AGENT_LABELS
+    ))
+
+# Function to evaluate a CV with the chosen engine; both return the same per-agent results.
+# Given an earlier version of the CV and its results, the agents engine only runs again the
+# agents whose input changed; callers pass only results whose fingerprint still matches.
+# With a job description, the keyword criteria are scored locally against it.
+def run_evaluation(cv_text, engine="agents", on_complete=None, thread_initializer=None, on_field=None,
+                   previous_text=None, previous_results=None, job_description=None):
+    if engine == "agents" and previous_text is not None and previous_results:
+        affected = affected_agents(previous_text, cv_text)
+        reuse = {agent_name: result for agent_name, result in previous_results.items()
+                 if agent_name in AGENT_LABELS and agent_name not in affected and result is not None}
+        if reuse:
+            return run_agents(cv_text, on_complete=on_complete, thread_initializer=thread_initializer,
+                              on_field=on_field, reuse=reuse, job_description=job_description)
+    if engine == "fused":
+        return run_fused(cv_text, on_complete=on_complete, job_description=job_description)
+    return run_agents(cv_text, on_complete=on_complete, thread_initializer=thread_initializer, on_field=on_field,
+                      job_description=job_description)
+
+# Function to run coordinator agent. Scores are aggregated locally; the model is
+# only asked for the qualitative summary, and not at all in fast mode or when it fails.
+def run_coordinator(results, fast=False):
+    with metrics.span("coordinator") as span:
+        scores = scoring.aggregate_scores(results)
+        if fast:
+            span.outcome = "local"
+            return {**scores, **scoring.local_summary(results)}
+        return _run_coordinator_model(results, scores, span)
+
+# Function to ask the model for the coordinator's qualitative summary
+def _run_coordinator_model(results, scores, span):
+    try:
+        coordinator_prompt = AGENT_PROMPTS["coordinator"].format(
+            format_ats_result=json.dumps(results["format_ats"]),
+            contact_summary_result=json.dumps(results["contact_summary"]),
+            work_experience_result=json.dumps(results["work_experience"]),
+            education_skills_result=json.dumps(results["education_skills"]),
+            optional_mistakes_result=json.dumps(results["optional_mistakes"]),
+            total_score=scores["total_score"],
+            kategori=scores["kategori"]
+        )
+        
+        # The coordinator's input is the agents' output, so key on that
+        cache = result_cache.get_cache()
+        key = result_cache.cache_key(
+            json.dumps(results, sort_keys=True), "coordinator", AGENT_PROMPTS["coordinator"],
+            model_routing.route_id(MODEL_NAME)
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            span.outcome = "cache_hit"
+            return {**cached, **scores}
+        
+        span.prompt_tokens = rate_limiter.estimate_tokens(coordinator_prompt)
+        # Scores are already final, so only an unusable fast answer is escalated
+        for model_name in model_routing.models(MODEL_NAME):
+            final = model_name == MODEL_NAME
+            started = time.monotonic()
+            response_text = routed_call(
+                "coordinator", model_name, span, get_backend().generate, coordinator_prompt, model_name,
+                estimated_tokens=span.prompt_tokens
+            )
+            if response_text is None:
+                continue
+            span.response_tokens = rate_limiter.estimate_tokens(response_text)
+
+            try:
+                result, repaired = response_parser.parse_json_response(response_text)
+            except response_parser.ResponseParseError as e:
+                if not final:
+                    model_routing.stats.record("coordinator", model_name, time.monotonic() - started, "invalid")
+                    span.outcome = "escalated"
+                    continue
+                span.outcome = "invalid_json"
+                logger.error(f"Could not parse JSON from coordinator response: {e}")
+                logger.debug(response_text)
+                return {**scores, **scoring.local_summary(results)}
+
+            result, missing = response_parser.validate(result, RESPONSE_SCHEMAS["coordinator"])
+            reason = "invalid" if missing and not final else None
+            model_routing.stats.record("coordinator", model_name, time.monotonic() - started, reason)
+            if reason is None:
+                break
+            span.outcome = "escalated"
+
+        if missing:
+            # Summary lists the model left out are filled from the agents' own findings
+            span.outcome = "incomplete"
+            fallback = scoring.local_summary(results)
+            result.update({field: fallback[field] for field in missing})
+        else:
+            if repaired:
+                span.outcome = "repaired"
+            cache.set(key, result)
+        return {**result, **scores}
+            
+    except Exception as e:
+        span.outcome = "error"
+        logger.error(f"Error running coordinator: {e}")
+        return {**scores, **scoring.local_summary(results)}
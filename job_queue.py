@@ -0,0 +1,301 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import evaluator
+import metrics
+import result_cache
+import revisions
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+JSON_COLUMNS = ("agents", "coordinator", "stages")
+
+# Workers refresh the heartbeat of their running jobs this often; a running job whose
+# heartbeat is older than STALE_AFTER belongs to a dead worker and is queued again
+STALE_AFTER = float(os.environ.get("CV_JOB_STALE_SECONDS", 60))
+HEARTBEAT_INTERVAL = min(10, STALE_AFTER / 3)
+# Streamed fields are written to the job row at most this often
+PROGRESS_INTERVAL = 0.5
+
+
+class JobQueue:
+    """SQLite-backed queue of CV evaluations, looked up by CV text hash"""
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " cv_hash TEXT NOT NULL, engine TEXT NOT NULL, fast INTEGER NOT NULL,"
+            " status TEXT NOT NULL, stage TEXT, completed INTEGER NOT NULL DEFAULT 0,"
+            " cv_text TEXT, agents TEXT, coordinator TEXT, stages TEXT, error TEXT,"
+            " created_at REAL NOT NULL, started_at REAL, finished_at REAL, heartbeat_at REAL)"
+        )
+        columns = [row["name"] for row in self.conn.execute("PRAGMA table_info(jobs)")]
+        if "heartbeat_at" not in columns:
+            self.conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_lookup ON jobs (cv_hash, engine, fast, id)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    def _row(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] else None
+        return job
+
+    def _update(self, job_id, **fields):
+        for column in JSON_COLUMNS:
+            if column in fields:
+                fields[column] = json.dumps(fields[column], ensure_ascii=False)
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        with self.lock:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def submit(self, cv_text, engine="agents", fast=False):
+        """Queue an evaluation and return its job id; an identical queued, running or finished job is reused.
+
+        A running job whose worker died is queued again first, so a new
+        request never waits on it.
+        """
+        cv_hash = result_cache.text_hash(cv_text)
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(STALE_AFTER)
+                row = self.conn.execute(
+                    "SELECT id FROM jobs WHERE cv_hash = ? AND engine = ? AND fast = ? AND status != ?"
+                    " ORDER BY id DESC LIMIT 1",
+                    (cv_hash, engine, int(fast), FAILED),
+                ).fetchone()
+                if row is not None:
+                    job_id = row["id"]
+                else:
+                    job_id = self.conn.execute(
+                        "INSERT INTO jobs (cv_hash, engine, fast, status, cv_text, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                        (cv_hash, engine, int(fast), QUEUED, cv_text, time.time()),
+                    ).lastrowid
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get(self, job_id):
+        with self.lock:
+            return self._row(self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def find(self, cv_hash, engine="agents", fast=False):
+        """Latest job for this CV and run options, or None"""
+        with self.lock:
+            return self._row(self.conn.execute(
+                "SELECT * FROM jobs WHERE cv_hash = ? AND engine = ? AND fast = ? ORDER BY id DESC LIMIT 1",
+                (cv_hash, engine, int(fast)),
+            ).fetchone())
+
+    def count_active(self):
+        """Number of queued and running jobs"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", ACTIVE_STATUSES
+            ).fetchone()[0]
+
+    def claim(self):
+        """Atomically move the oldest queued job to running and return it, or None"""
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is not None:
+                    now = time.time()
+                    self.conn.execute(
+                        "UPDATE jobs SET status = ?, stage = ?, started_at = ?, heartbeat_at = ? WHERE id = ?",
+                        (RUNNING, "agents", now, now, row["id"]),
+                    )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self._row(row)
+
+    def update_progress(self, job_id, agents, completed=None, stage=None):
+        fields = {"agents": agents, "heartbeat_at": time.time()}
+        if completed is not None:
+            fields["completed"] = completed
+        if stage is not None:
+            fields["stage"] = stage
+        self._update(job_id, **fields)
+
+    def finish(self, job_id, agents, coordinator, stages):
+        # The CV text is only needed while the job runs
+        self._update(
+            job_id, status=DONE, stage=None, completed=len(agents), agents=agents,
+            coordinator=coordinator, stages=stages, cv_text=None, finished_at=time.time(),
+        )
+
+    def fail(self, job_id, error):
+        self._update(job_id, status=FAILED, error=error, finished_at=time.time())
+
+    def heartbeat(self, job_ids):
+        """Mark running jobs as alive"""
+        if not job_ids:
+            return
+        with self.lock:
+            self.conn.execute(
+                f"UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND id IN ({','.join('?' * len(job_ids))})",
+                (time.time(), RUNNING, *job_ids),
+            )
+
+    def _requeue_stale(self, older_than):
+        # Jobs from before heartbeats were recorded fall back to their start time
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, stage = NULL, completed = 0, agents = NULL, heartbeat_at = NULL"
+            " WHERE status = ? AND COALESCE(heartbeat_at, started_at) < ?",
+            (QUEUED, RUNNING, time.time() - older_than),
+        )
+
+    def requeue_stale(self, older_than=STALE_AFTER):
+        """Put running jobs back in the queue when their worker stopped sending heartbeats (e.g. the process died)"""
+        with self.lock:
+            self._requeue_stale(older_than)
+
+
+class WorkerPool:
+    """Background threads that claim queued jobs and run the evaluation pipeline"""
+
+    def __init__(self, jobs, workers=2, poll_interval=0.5):
+        self.jobs = jobs
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.stopped = threading.Event()
+        self.threads = []
+        self.running = set()
+        self.running_lock = threading.Lock()
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"cv-job-worker-{i}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        threading.Thread(target=self._beat, name="cv-job-heartbeat", daemon=True).start()
+
+    def _beat(self):
+        # Also recovers jobs of workers that died in other processes sharing the database
+        while not self.stopped.wait(HEARTBEAT_INTERVAL):
+            try:
+                with self.running_lock:
+                    running = list(self.running)
+                self.jobs.heartbeat(running)
+                self.jobs.requeue_stale()
+            except Exception:
+                evaluator.logger.exception("Job heartbeat failed")
+
+    def notify(self):
+        """Wake idle workers after a submit instead of waiting for the next poll"""
+        self.wakeup.set()
+
+    def stop(self, timeout=None):
+        """Let every worker finish its current job and exit; jobs still queued stay in the database"""
+        self.stopping.set()
+        self.wakeup.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self.threads:
+            thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        # Jobs still running past the timeout stop beating and are requeued by the next process
+        self.stopped.set()
+
+    def _work(self):
+        while not self.stopping.is_set():
+            job = self.jobs.claim()
+            if job is None:
+                self.wakeup.wait(self.poll_interval)
+                self.wakeup.clear()
+                continue
+            with self.running_lock:
+                self.running.add(job["id"])
+            try:
+                self.process(job)
+            finally:
+                with self.running_lock:
+                    self.running.discard(job["id"])
+
+    def process(self, job):
+        job_id = job["id"]
+        agents = {}
+        lock = threading.Lock()
+        last_write = [0.0]
+
+        # Partial fields are kept so pollers can render criteria before an agent finishes;
+        # they are written at most every PROGRESS_INTERVAL, finished agents always
+        def on_field(agent_name, key, value):
+            with lock:
+                agents.setdefault(agent_name, {})[key] = value
+                if time.monotonic() - last_write[0] >= PROGRESS_INTERVAL:
+                    last_write[0] = time.monotonic()
+                    self.jobs.update_progress(job_id, agents)
+
+        def on_complete(agent_name, completed, result):
+            with lock:
+                agents[agent_name] = result
+                self.jobs.update_progress(job_id, agents, completed=completed)
+
+        try:
+            with metrics.trace() as stage_trace:
+                results = revisions.run_evaluation(
+                    job["cv_text"], engine=job["engine"], on_complete=on_complete, on_field=on_field
+                )
+                self.jobs.update_progress(job_id, results, stage="coordinator")
+                coordinator = evaluator.run_coordinator(results, fast=bool(job["fast"]))
+            self.jobs.finish(job_id, results, coordinator, stage_trace.records)
+        except Exception as e:
+            evaluator.logger.exception(f"Job {job_id} failed")
+            self.jobs.fail(job_id, str(e))
+
+
+_queue = None
+_pool = None
+_setup_lock = threading.Lock()
+
+
+def get_queue():
+    """Process-wide job queue with its worker pool started on first use"""
+    global _queue, _pool
+    with _setup_lock:
+        if _queue is None:
+            _queue = JobQueue(os.environ.get("CV_JOB_DB", os.path.join(".cache", "jobs.sqlite")))
+            _queue.requeue_stale()
+            _pool = WorkerPool(_queue, workers=int(os.environ.get("CV_JOB_WORKERS", 2)))
+            _pool.start()
+        return _queue
+
+
+def shutdown(timeout=None):
+    """Stop the process-wide worker pool after the jobs it is running"""
+    if _pool is not None:
+        _pool.stop(timeout)
+
+
+def submit(cv_text, engine="agents", fast=False):
+    """Queue an evaluation on the process-wide queue and wake a worker"""
+    job_id = get_queue().submit(cv_text, engine=engine, fast=fast)
+    _pool.notify()
+    return job_id
@@ -0,0 +1,196 @@
+import re
+
+import cv_sections
+import relevance
+
+
+# Criteria scored locally, per agent; the model prompts leave these out
+LOCAL_CRITERIA = {
+    "format_ats": ["format_file", "bullet_points", "konsistensi"],
+    "contact_summary": ["informasi_kontak", "alamat_email"],
+}
+
+# Keyword criteria, scored locally only when a job description is given:
+# agent -> (criteria group, CV section, section name, max score, matches for full marks)
+KEYWORD_CRITERIA = {
+    "contact_summary": ("ringkasan_profesional", "summary", "ringkasan", 5, 4),
+    "education_skills": ("keterampilan", "skills", "keterampilan", 3, 6),
+}
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Indonesian mobile numbers (08xx / +62 8xx / 62 8xx) or any +country number
+PHONE_RE = re.compile(r"(?:\+62|\b62|\b0)[\s.-]?8\d(?:[\s.-]?\d){6,11}\b|\+\d{1,3}[\s.-]?\d(?:[\s.-]?\d){7,12}\b")
+LINKEDIN_RE = re.compile(r"linkedin\.com/\S+", re.IGNORECASE)
+
+# Bullet glyphs, including the private-use code points PDF symbol fonts extract to
+BULLET_CHARS = "•●▪■◦○·‣∙*-–—➢➤►✓✔\uf0a7\uf0b7\uf076\uf0d8\uf0fc"
+BULLET_RE = re.compile(r"^\s*(?:([" + re.escape(BULLET_CHARS) + r"])|(\d{1,2}[.)]))\s+\S")
+
+MONTHS = (
+    "jan|januari|january|feb|februari|february|mar|maret|march|apr|april|mei|may|jun|juni|june|"
+    "jul|juli|july|agu|agt|agustus|aug|august|sep|sept|september|okt|oktober|oct|october|"
+    "nov|november|des|desember|dec|december"
+)
+DATE_STYLES = {
+    "nama bulan": re.compile(r"\b(?:" + MONTHS + r")\.?\s+(?:19|20)\d{2}\b", re.IGNORECASE),
+    "angka": re.compile(r"\b(?:0?[1-9]|1[0-2])[/.-](?:19|20)\d{2}\b"),
+}
+
+# Words that make an email address look unprofessional
+UNPROFESSIONAL_EMAIL_WORDS = {
+    "cute", "sexy", "love", "baby", "babe", "angel", "princess", "prince", "gamer", "cool", "keren",
+    "imut", "cantik", "ganteng", "lucu", "manis", "kece", "sayang", "cinta", "galau", "alay",
+}
+
+# Title lines that open many CVs in place of, or above, the candidate's name
+DOCUMENT_TITLES = {
+    "cv", "curriculum vitae", "curriculum vitae (cv)", "resume", "résumé", "daftar riwayat hidup", "riwayat hidup",
+}
+# Honorifics and academic titles written before a name
+NAME_PREFIXES = {"dr", "drs", "dra", "ir", "prof", "h", "hj", "mr", "mrs", "ms"}
+# Markdown and decoration around a name line
+_NAME_MARKS_RE = re.compile(r"^[#*_>\s]+|[*_\s]+$")
+
+MIN_TEXT_LENGTH = 200
+MAX_GARBLED_RATIO = 0.05
+
+
+def criterion(score, maximum, penilaian, alasan):
+    return {"score": score, "max": maximum, "penilaian": penilaian, "alasan": alasan}
+
+
+def format_file(cv_text):
+    """Whether the file has a clean text layer an ATS can parse"""
+    text = cv_text.strip()
+    if len(text) < MIN_TEXT_LENGTH:
+        return criterion(0, 10, "Tidak", "Hampir tidak ada teks yang dapat diekstrak; berkas kemungkinan berupa gambar atau hasil pindaian yang tidak terbaca ATS.")
+    # Replacement characters and private-use glyphs (other than symbol-font bullets)
+    garbled = sum(1 for char in text if char == "\ufffd" or ("\ue000" <= char <= "\uf8ff" and char not in BULLET_CHARS))
+    if garbled / len(text) > MAX_GARBLED_RATIO:
+        return criterion(5, 10, "Tidak", "Sebagian teks terekstrak sebagai karakter yang tidak terbaca; font atau simbol khusus dapat membingungkan ATS.")
+    return criterion(10, 10, "Ya", "Teks berkas dapat diekstrak dengan bersih, sehingga mudah diproses oleh ATS.")
+
+
+def bullet_points(cv_text, found_sections):
+    """Share of bullet lines in the experience, skills and optional sections (whole CV if none found)"""
+    body = "\n".join(found_sections.get(section, "") for section in ("experience", "skills", "optional"))
+    lines = [line for line in (body if body.strip() else cv_text).splitlines() if line.strip()]
+    bullets = sum(1 for line in lines if BULLET_RE.match(line))
+    ratio = bullets / len(lines) if lines else 0
+    if bullets >= 5 and ratio >= 0.3:
+        return criterion(10, 10, "Ya", f"{bullets} baris disajikan sebagai bullet points ({ratio:.0%} dari isi pengalaman dan keterampilan).")
+    if bullets >= 3:
+        return criterion(6, 10, "Sebagian", f"Hanya {bullets} baris berupa bullet points; sajikan pengalaman dan keterampilan dalam poin-poin ringkas.")
+    return criterion(0, 10, "Tidak", "Pengalaman dan keterampilan tidak disajikan dalam bentuk bullet points.")
+
+
+def konsistensi(cv_text):
+    """Consistency of bullet style, date format and heading case"""
+    lines = cv_text.splitlines()
+    issues = []
+
+    bullet_styles = set()
+    for line in lines:
+        match = BULLET_RE.match(line)
+        if match:
+            bullet_styles.add(match.group(1) or "angka")
+    if len(bullet_styles) > 1:
+        issues.append(f"gaya bullet berbeda-beda ({' '.join(sorted(bullet_styles))})")
+
+    date_styles = [name for name, pattern in DATE_STYLES.items() if pattern.search(cv_text)]
+    if len(date_styles) > 1:
+        issues.append("format tanggal bercampur (nama bulan dan angka)")
+
+    headings = [line.strip() for line in lines if cv_sections.heading_section(line)]
+    if any(heading.isupper() for heading in headings) and any(not heading.isupper() for heading in headings):
+        issues.append("huruf kapital judul bagian tidak seragam")
+
+    if not issues:
+        return criterion(5, 5, "Ya", "Gaya bullet, format tanggal dan judul bagian konsisten.")
+    return criterion(max(0, 5 - 2 * len(issues)), 5, "Tidak", "Tidak konsisten: " + "; ".join(issues) + ".")
+
+
+def alamat_email(cv_text):
+    """Whether the email address looks professional"""
+    match = EMAIL_RE.search(cv_text)
+    if not match:
+        return criterion(0, 5, "Tidak Ada", "Tidak ditemukan alamat email.")
+    email = match.group(0)
+    local_part = email.split("@")[0].lower()
+    words = [word for word in UNPROFESSIONAL_EMAIL_WORDS if word in local_part]
+    if words:
+        return criterion(2, 5, "Kurang Profesional", f"{email} memuat kata informal ({', '.join(sorted(words))}); gunakan nama lengkap.")
+    if len(re.findall(r"\d", local_part)) >= 5:
+        return criterion(3, 5, "Kurang Profesional", f"{email} memuat banyak angka; alamat berbasis nama lebih profesional.")
+    return criterion(5, 5, "Profesional", f"{email} terlihat profesional.")
+
+
+def has_name(found_sections):
+    """A plausible name on the first line of the CV, after any "CURRICULUM VITAE" style title line"""
+    for line in found_sections.get("header", "").splitlines():
+        line = _NAME_MARKS_RE.sub("", line).strip()
+        if not line or line.lower().rstrip(".:") in DOCUMENT_TITLES:
+            continue
+        # Academic degrees follow a comma ("Budi Santoso, S.Kom."); honorifics precede the name
+        words = line.split(",")[0].split()
+        while words and words[0].lower().rstrip(".") in NAME_PREFIXES:
+            words = words[1:]
+        return 1 <= len(words) <= 5 and all(
+            len(word) > 1 and word.replace(".", "").replace("'", "").replace("-", "").isalpha() for word in words
+        )
+    return False
+
+
+def informasi_kontak(cv_text, found_sections):
+    """Presence of name, email, phone number and LinkedIn"""
+    present = {
+        "nama lengkap": has_name(found_sections),
+        "alamat email": bool(EMAIL_RE.search(cv_text)),
+        "nomor telepon": bool(PHONE_RE.search(cv_text)),
+    }
+    missing = [item for item, found in present.items() if not found]
+    score = 3 * (len(present) - len(missing))
+    if LINKEDIN_RE.search(cv_text):
+        score += 1
+    elif not missing:
+        return criterion(score, 10, "Lengkap", "Nama, email dan nomor telepon tercantum; tautan LinkedIn (opsional) belum ada.")
+    if missing:
+        return criterion(score, 10, "Kurang Lengkap", f"Informasi yang hilang: {', '.join(missing)}.")
+    return criterion(score, 10, "Lengkap", "Nama, email, nomor telepon dan LinkedIn tercantum.")
+
+
+def kata_kunci(section_text, keywords, maximum, target, section_name, cv_text=""):
+    """How many of the job description's keywords a CV section uses (the whole CV if the section is not found)"""
+    where = f"Bagian {section_name}"
+    if not section_text.strip():
+        section_text = cv_text
+        where = f"Bagian {section_name} tidak ditemukan; CV"
+    matched, missing = relevance.keyword_matches(section_text, keywords)
+    score = round(maximum * min(1, len(matched) / target))
+    hint = f" Pertimbangkan: {', '.join(missing[:5])}." if missing else ""
+    if not matched:
+        return criterion(0, maximum, "Tidak", f"{where} tidak memuat kata kunci dari deskripsi pekerjaan.{hint}")
+    return criterion(score, maximum, "Ya", f"{where} memuat {len(matched)} kata kunci dari deskripsi pekerjaan: {', '.join(matched)}.{hint}")
+
+
+def run_checks(cv_text, found_sections=None, job_description=None):
+    """Locally scored criteria of every agent: {agent_name: {criterion_key: criterion}}"""
+    if found_sections is None:
+        found_sections = cv_sections.split_sections(cv_text)
+    checks = {
+        "format_ats": {
+            "format_file": format_file(cv_text),
+            "bullet_points": bullet_points(cv_text, found_sections),
+            "konsistensi": konsistensi(cv_text),
+        },
+        "contact_summary": {
+            "informasi_kontak": informasi_kontak(cv_text, found_sections),
+            "alamat_email": alamat_email(cv_text),
+        },
+    }
+    if job_description:
+        keywords = relevance.job_keywords(job_description)
+        for agent_name, (group, section, section_name, maximum, target) in KEYWORD_CRITERIA.items():
+            criteria = kata_kunci(found_sections.get(section, ""), keywords, maximum, target, section_name, cv_text)
+            checks.setdefault(agent_name, {})[group] = {"kata_kunci": criteria}
+    return checks
@@ -0,0 +1,239 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+
+_current_span = contextvars.ContextVar("cv_metrics_span", default=None)
+_current_trace = contextvars.ContextVar("cv_metrics_trace", default=None)
+
+QUANTILES = (0.5, 0.95)
+
+
+class Span:
+    """Timing and accounting for one pipeline stage"""
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.started_at = time.time()
+        self.duration = None
+        self.prompt_tokens = None
+        self.response_tokens = None
+        self.retries = 0
+        self.outcome = "ok"
+
+    def as_record(self):
+        return {
+            "stage": self.stage,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "prompt_tokens": self.prompt_tokens,
+            "response_tokens": self.response_tokens,
+            "retries": self.retries,
+            "outcome": self.outcome,
+        }
+
+
+class RollingHistogram:
+    """Quantiles over the most recent `window` samples, plus lifetime count and sum"""
+
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Registry:
+    """Process-wide store of stage metrics, with an optional JSONL sink"""
+
+    def __init__(self, jsonl_path=None, window=1000):
+        self.lock = threading.Lock()
+        self.window = window
+        self.histograms = {}
+        self.outcomes = Counter()
+        self.retries = Counter()
+        self.tokens = Counter()
+        self.jsonl_path = jsonl_path
+
+    def observe(self, span):
+        record = span.as_record()
+        with self.lock:
+            histogram = self.histograms.setdefault(span.stage, RollingHistogram(self.window))
+            histogram.observe(span.duration)
+            self.outcomes[(span.stage, span.outcome)] += 1
+            self.retries[span.stage] += span.retries
+            if span.prompt_tokens:
+                self.tokens[(span.stage, "prompt")] += span.prompt_tokens
+            if span.response_tokens:
+                self.tokens[(span.stage, "response")] += span.response_tokens
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def summary(self):
+        """One row per stage: count, rolling p50/p95 and mean duration in seconds"""
+        with self.lock:
+            return [
+                {
+                    "stage": stage,
+                    "count": histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p95": histogram.quantile(0.95),
+                    "mean": histogram.sum / histogram.count,
+                }
+                for stage, histogram in sorted(self.histograms.items())
+            ]
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            "# HELP cv_stage_duration_seconds Duration of pipeline stages (rolling quantiles)",
+            "# TYPE cv_stage_duration_seconds summary",
+        ]
+        with self.lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                for q in QUANTILES:
+                    value = histogram.quantile(q)
+                    if value is not None:
+                        lines.append(f'cv_stage_duration_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'cv_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'cv_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines += ["# HELP cv_stage_outcomes_total Completed stages by outcome", "# TYPE cv_stage_outcomes_total counter"]
+            for (stage, outcome), count in sorted(self.outcomes.items()):
+                lines.append(f'cv_stage_outcomes_total{{stage="{stage}",outcome="{outcome}"}} {count}')
+
+            lines += ["# HELP cv_stage_retries_total Model call retries by stage", "# TYPE cv_stage_retries_total counter"]
+            for stage, count in sorted(self.retries.items()):
+                lines.append(f'cv_stage_retries_total{{stage="{stage}"}} {count}')
+
+            lines += ["# HELP cv_tokens_total Prompt and response tokens by stage", "# TYPE cv_tokens_total counter"]
+            for (stage, kind), count in sorted(self.tokens.items()):
+                lines.append(f'cv_tokens_total{{stage="{stage}",kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(jsonl_path=os.environ.get("CV_METRICS_JSONL"))
+
+
+class Trace:
+    """Records of every stage that finished while this trace was active"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.records = []
+
+    def append(self, record):
+        with self.lock:
+            self.records.append(record)
+
+
+@contextmanager
+def trace():
+    """Collect the stage records of one evaluation (propagates to threads started via contextvars)"""
+    current = Trace()
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(stage):
+    """Time a pipeline stage; helpers below annotate the innermost active span"""
+    current = Span(stage)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except Exception:
+        current.outcome = "error"
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        registry.observe(current)
+        active_trace = _current_trace.get()
+        if active_trace is not None:
+            active_trace.append(current.as_record())
+
+
+def current_span():
+    return _current_span.get()
+
+
+def set_outcome(outcome):
+    current = _current_span.get()
+    if current is not None:
+        current.outcome = outcome
+
+
+def set_tokens(prompt=None, response=None):
+    current = _current_span.get()
+    if current is not None:
+        if prompt is not None:
+            current.prompt_tokens = prompt
+        if response is not None:
+            current.response_tokens = response
+
+
+def note_retry():
+    current = _current_span.get()
+    if current is not None:
+        current.retries += 1
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def metrics_handler():
+    """Request handler class for /metrics; http.server is only imported when metrics are served"""
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return MetricsHandler
+
+
+def start_http_server(port=None, host="0.0.0.0"):
+    """Serve /metrics on a background thread (once per process); port defaults to CV_METRICS_PORT"""
+    global _server
+    port = port or os.environ.get("CV_METRICS_PORT")
+    if not port:
+        return None
+    from http.server import ThreadingHTTPServer
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, int(port)), metrics_handler())
+            threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
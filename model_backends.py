@@ -0,0 +1,182 @@
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import response_parser
+
+
+class GeminiBackend:
+    """Google Gemini through google-generativeai"""
+
+    def __init__(self, api_key=None):
+        # Imported here so the offline backends work without google-generativeai installed
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key or os.environ["GEMINI_API_KEY"])
+        self.genai = genai
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def model(self, model_name):
+        """GenerativeModel for `model_name`, created once and shared by every call"""
+        with self.lock:
+            if model_name not in self.models:
+                self.models[model_name] = self.genai.GenerativeModel(model_name)
+            return self.models[model_name]
+
+    def generate(self, prompt, model_name):
+        """Full response text for `prompt`"""
+        return self.model(model_name).generate_content(prompt).text
+
+    def generate_stream(self, prompt, model_name):
+        """Response text for `prompt` as an iterator of chunks"""
+        for chunk in self.model(model_name).generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class FakeAPIError(Exception):
+    """Error raised by FakeBackend; carries an HTTP status `code` like google.api_core errors"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+# Criterion key that only appears in each agent's prompt, used to tell prompts apart
+AGENT_MARKERS = {
+    "format_ats": '"tata_letak"',
+    "contact_summary": '"kepercayaan_diri"',
+    "work_experience": '"detail_pengalaman"',
+    "education_skills": '"tingkat_kemahiran"',
+    "optional_mistakes": '"ketidakjujuran"',
+}
+
+RATINGS = ["Kurang", "Cukup", "Baik"]
+
+
+class FakeBackend:
+    """Offline stand-in for Gemini that answers every prompt with schema-valid JSON.
+
+    Latency, random errors and bursts of 429s are configurable so the
+    scheduler, rate limiter and cache can be measured without a network.
+    Answers are deterministic per prompt.
+    """
+
+    def __init__(self, latency=1.0, jitter=0.2, error_rate=0.0, burst_rate=0.0, burst_length=3,
+                 chunk_size=40, chunk_delay=0.01, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.burst_rate = burst_rate
+        self.burst_length = burst_length
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.burst_remaining = 0
+        self.calls = 0
+
+    @classmethod
+    def from_env(cls, api_key=None):
+        # api_key is accepted for interface parity with GeminiBackend and ignored
+        return cls(
+            latency=float(os.environ.get("FAKE_LATENCY", 1.0)),
+            jitter=float(os.environ.get("FAKE_JITTER", 0.2)),
+            error_rate=float(os.environ.get("FAKE_ERROR_RATE", 0.0)),
+            burst_rate=float(os.environ.get("FAKE_BURST_RATE", 0.0)),
+            burst_length=int(os.environ.get("FAKE_BURST_LENGTH", 3)),
+        )
+
+    def _maybe_fail(self):
+        with self.lock:
+            self.calls += 1
+            if self.burst_remaining == 0 and self.random.random() < self.burst_rate:
+                self.burst_remaining = self.burst_length
+            if self.burst_remaining > 0:
+                self.burst_remaining -= 1
+                raise FakeAPIError(429, "Resource has been exhausted (fake quota burst)")
+            if self.random.random() < self.error_rate:
+                raise FakeAPIError(503, "Service unavailable (fake)")
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter))
+        time.sleep(delay)
+
+    def generate(self, prompt, model_name):
+        self._maybe_fail()
+        return self.answer(prompt)
+
+    def generate_stream(self, prompt, model_name):
+        self._maybe_fail()
+        text = self.answer(prompt)
+        for start in range(0, len(text), self.chunk_size):
+            if start:
+                time.sleep(self.chunk_delay)
+            yield text[start:start + self.chunk_size]
+
+    def answer(self, prompt):
+        """Fenced JSON answer shaped like the real model's reply to `prompt`"""
+        rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+        if '"kekuatan"' in prompt:
+            result = {
+                "kekuatan": [f"Kekuatan {i}" for i in range(1, 4)],
+                "kekurangan": [f"Kekurangan {i}" for i in range(1, 4)],
+                "saran_perbaikan": [f"Saran {i}" for i in range(1, 6)],
+            }
+        else:
+            agents = [name for name, marker in AGENT_MARKERS.items() if marker in prompt]
+            if len(agents) > 1:
+                result = {name: fake_agent_result(name, rng) for name in agents}
+            elif agents:
+                result = fake_agent_result(agents[0], rng)
+            else:
+                result = {}
+        return "```json\n" + json.dumps(result, ensure_ascii=False, indent=2) + "\n```"
+
+
+def agent_template(agent_name):
+    """The output schema embedded at the end of an agent's prompt, as a dict"""
+    import evaluator
+
+    return response_parser.schema_from_prompt(evaluator.AGENT_PROMPTS[agent_name])
+
+
+def _fill(node, rng):
+    total = 0
+    for key, value in node.items():
+        if isinstance(value, dict) and "score" in value:
+            if "min" in value:
+                # Penalties are rare
+                value["score"] = value["min"] if rng.random() < 0.05 else 0
+            else:
+                value["score"] = rng.randint(value["max"] // 2, value["max"])
+            # Ratings follow the score, except for the odd contradictory answer
+            ratio = value["score"] / value["max"] if value.get("max") else 1
+            rating = RATINGS[0] if ratio < 0.5 else RATINGS[1] if ratio < 0.8 else RATINGS[2]
+            value["penilaian"] = rng.choice(RATINGS) if rng.random() < 0.05 else rating
+            value["alasan"] = f"Penilaian otomatis untuk {key}."
+            total += value["score"]
+        elif isinstance(value, dict):
+            total += _fill(value, rng)
+    return total
+
+
+def fake_agent_result(agent_name, rng):
+    result = agent_template(agent_name)
+    result["total_score"] = _fill(result, rng)
+    result["ringkasan"] = f"Ringkasan evaluasi {agent_name}."
+    result["saran_perbaikan"] = [f"Saran {agent_name} {i}" for i in range(1, 3)]
+    return result
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "fake": FakeBackend.from_env,
+}
+
+
+def create_backend(name=None, **kwargs):
+    """Backend by name; defaults to the CV_MODEL_BACKEND environment variable, then "gemini" """
+    name = name or os.environ.get("CV_MODEL_BACKEND", "gemini")
+    return BACKENDS[name](**kwargs)
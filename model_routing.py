@@ -0,0 +1,148 @@
+import os
+import threading
+from collections import Counter, defaultdict
+
+import scoring
+
+
+# "tiered": fast model first, escalating to the strong model when needed; "off": strong model only
+ROUTING = os.environ.get("CV_MODEL_ROUTING", "tiered")
+FAST_MODEL = os.environ.get("CV_FAST_MODEL", "gemini-2.0-flash")
+# Largest gap between the model's stated total and the sum of its criteria
+TOTAL_TOLERANCE = 2
+# Aggregate percentages this close to a kategori threshold are redone by the strong model
+BORDERLINE_MARGIN = float(os.environ.get("CV_BORDERLINE_MARGIN", 2))
+# Strong-to-fast latency ratio assumed for the savings estimate until both tiers have answered
+STRONG_LATENCY_RATIO = float(os.environ.get("CV_STRONG_LATENCY_RATIO", 3))
+
+# Ratings that contradict a low or a high score
+POSITIVE_RATINGS = {"baik", "sangat baik", "ya", "ada", "lengkap", "sangat relevan", "profesional"}
+NEGATIVE_RATINGS = {"kurang", "tidak", "tidak ada", "kurang lengkap", "kurang relevan", "kurang profesional"}
+
+
+def models(strong_model):
+    """Models to try in order for one call"""
+    if ROUTING == "off" or FAST_MODEL == strong_model:
+        return [strong_model]
+    return [FAST_MODEL, strong_model]
+
+
+def route_id(strong_model):
+    """Identifies the routing in cache keys, so tiered and single-model results are kept apart"""
+    return ">".join(models(strong_model))
+
+
+def _criteria(node, path=""):
+    for key, value in node.items():
+        if isinstance(value, dict) and "score" in value:
+            yield path + key, value
+        elif isinstance(value, dict):
+            yield from _criteria(value, path + key + ".")
+
+
+def inconsistent_criteria(result):
+    """Paths of criteria whose rating contradicts their score (e.g. "Baik" with a third of the points)"""
+    paths = []
+    for path, criterion in _criteria(result):
+        maximum = criterion.get("max")
+        if not maximum:
+            continue
+        ratio = criterion["score"] / maximum
+        rating = str(criterion.get("penilaian", "")).strip().lower()
+        if (rating in POSITIVE_RATINGS and ratio < 0.4) or (rating in NEGATIVE_RATINGS and ratio > 0.8):
+            paths.append(path)
+    return paths
+
+
+def escalation_reason(result, missing, reported_total=None):
+    """Why a fast-model answer should be redone by the strong model, or None to keep it.
+
+    Closeness to a kategori threshold is checked on the aggregate score once
+    every agent has answered (see borderline), since that is what the
+    thresholds apply to.
+    """
+    if result is None or missing:
+        return "invalid"
+    if isinstance(reported_total, (int, float)) and abs(reported_total - result["total_score"]) > TOTAL_TOLERANCE:
+        return "inconsistent"
+    if inconsistent_criteria(result):
+        return "inconsistent"
+    return None
+
+
+def borderline(percentage):
+    """Whether an aggregate percentage is within BORDERLINE_MARGIN of a kategori threshold"""
+    return any(abs(percentage - minimum) < BORDERLINE_MARGIN for minimum, _ in scoring.CATEGORY_THRESHOLDS)
+
+
+class RoutingStats:
+    """Escalation counts and per-tier latency per agent, to report the escalation rate and latency saved"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = Counter()
+        self.reasons = defaultdict(Counter)
+        self.seconds = defaultdict(lambda: defaultdict(list))
+
+    def record(self, stage, model_name, seconds, reason=None):
+        """One answer from `model_name`; `reason` is set when it was escalated"""
+        with self.lock:
+            if model_name == FAST_MODEL:
+                self.calls[stage] += 1
+            self.seconds[stage][model_name].append(seconds)
+            if reason:
+                self.reasons[stage][reason] += 1
+
+    def escalate(self, stage, reason):
+        """A fast answer that was kept at first and redone by the strong model later"""
+        with self.lock:
+            self.reasons[stage][reason] += 1
+
+    def _latency_ratio(self, strong_model):
+        # Mean strong-to-fast latency ratio of the stages where both tiers have answered
+        ratios = []
+        for seconds in self.seconds.values():
+            fast, strong = seconds.get(FAST_MODEL), seconds.get(strong_model)
+            if fast and strong and sum(fast):
+                ratios.append((sum(strong) / len(strong)) / (sum(fast) / len(fast)))
+        return sum(ratios) / len(ratios) if ratios else STRONG_LATENCY_RATIO
+
+    def summary(self, strong_model):
+        """Per stage: calls, escalation rate and reasons, mean latency per tier and estimated seconds saved.
+
+        Savings assume every call kept on the fast model would otherwise have
+        taken the strong model's mean latency; escalated calls cost their fast
+        attempt. A stage that never reached the strong model has its latency
+        estimated from the other stages' latency ratio, or STRONG_LATENCY_RATIO.
+        """
+        rows = []
+        with self.lock:
+            ratio = self._latency_ratio(strong_model)
+            for stage in sorted(self.calls):
+                fast = self.seconds[stage][FAST_MODEL]
+                strong = self.seconds[stage][strong_model]
+                escalated = sum(self.reasons[stage].values())
+                fast_mean = sum(fast) / len(fast) if fast else None
+                strong_mean = sum(strong) / len(strong) if strong else None
+                estimated = strong_mean is None and fast_mean is not None
+                if estimated:
+                    strong_mean = fast_mean * ratio
+                saved = None
+                if fast:
+                    kept = len(fast) - escalated
+                    saved = kept * (strong_mean - fast_mean) - escalated * fast_mean
+                rows.append({
+                    "stage": stage,
+                    "calls": self.calls[stage],
+                    "escalated": escalated,
+                    "escalation_rate": escalated / self.calls[stage],
+                    "reasons": dict(self.reasons[stage]),
+                    "fast_seconds": fast_mean,
+                    "strong_seconds": strong_mean,
+                    "strong_estimated": estimated,
+                    "saved_seconds": saved,
+                })
+        return rows
+
+
+stats = RoutingStats()
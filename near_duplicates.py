@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from array import array
+
+
+# Words per shingle; a changed word only touches the shingles that contain it
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+_PRIME = (1 << 61) - 1
+_MASK = (1 << 64) - 1
+_rng = random.Random(20240521)
+_COEFFICIENTS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERMUTATIONS)]
+
+# What batch runs do with a near-duplicate: reuse its agent results, flag it for review, or nothing
+ACTIONS = ("reuse", "flag", "off")
+DEFAULT_THRESHOLD = float(os.environ.get("CV_DUPLICATE_THRESHOLD", 0.9))
+DEFAULT_ACTION = os.environ.get("CV_DUPLICATE_ACTION", "flag")
+# Indexed results older than this are neither matched nor reused
+DEFAULT_TTL = float(os.environ.get("CV_DUPLICATE_TTL_SECONDS", 7 * 24 * 3600))
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _hash64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def shingles(cv_text):
+    """Hashes of the lower-cased word n-grams of a CV, so layout and punctuation do not matter"""
+    words = _WORD_RE.findall(cv_text.lower())
+    if len(words) <= SHINGLE_SIZE:
+        return {_hash64(" ".join(words).encode("utf-8"))} if words else set()
+    return {
+        _hash64(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(cv_text):
+    """MinHash signature of a CV's shingles; None for a CV without words"""
+    hashes = shingles(cv_text)
+    if not hashes:
+        return None
+    return array("Q", (min(((a * h + b) % _PRIME) & _MASK for h in hashes) for a, b in _COEFFICIENTS))
+
+
+def similarity(signature, other):
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for x, y in zip(signature, other) if x == y) / len(signature)
+
+
+def banding(threshold):
+    """(bands, rows) splitting the signature so pairs at `threshold` almost always share a band.
+
+    With b bands of r rows, pairs collide from about (1/b)^(1/r) similarity.
+    The largest r keeping that point safely below the threshold is chosen,
+    which keeps false candidates (checked against the full signature) rare.
+    """
+    rows = 1
+    for candidate in (2, 4, 8, 16, 32):
+        if (candidate / NUM_PERMUTATIONS) ** (1 / candidate) <= threshold - 0.05:
+            rows = candidate
+    return NUM_PERMUTATIONS // rows, rows
+
+
+class DuplicateIndex:
+    """On-disk MinHash LSH index of evaluated CVs with their agent results.
+
+    A lookup only reads the CVs sharing a band bucket with the query
+    (an indexed SQLite lookup per band), so its cost does not grow with the
+    number of CVs in the index. Results are stored with the fingerprint of
+    the prompts, model and engine that produced them and expire after
+    `ttl_seconds`.
+    """
+
+    def __init__(self, path, threshold=DEFAULT_THRESHOLD, ttl_seconds=DEFAULT_TTL):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.bands, self.rows = banding(threshold)
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT NOT NULL, cv_hash TEXT NOT NULL UNIQUE,"
+            " signature BLOB NOT NULL, agents TEXT NOT NULL, created_at REAL NOT NULL,"
+            " fingerprint TEXT NOT NULL DEFAULT '')"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(documents)")]
+        if "fingerprint" not in columns:
+            # Entries indexed before fingerprints were stored can be flagged but never reused
+            self.conn.execute("ALTER TABLE documents ADD COLUMN fingerprint TEXT NOT NULL DEFAULT ''")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS buckets (band INTEGER, bucket INTEGER, document INTEGER)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS buckets_lookup ON buckets (band, bucket)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'rows'").fetchone()
+        if row is None or int(row[0]) != self.rows:
+            self._rebuild_buckets()
+        self.conn.commit()
+
+    def _band_keys(self, signature):
+        return [
+            (band, _hash64(signature[band * self.rows:(band + 1) * self.rows].tobytes()) - (1 << 63))
+            for band in range(self.bands)
+        ]
+
+    def _rebuild_buckets(self):
+        # The threshold changed the banding; signatures are kept, so only the buckets are redone
+        self.conn.execute("DELETE FROM buckets")
+        for document_id, blob in self.conn.execute("SELECT id, signature FROM documents").fetchall():
+            self._insert_buckets(document_id, array("Q", blob))
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rows', ?)", (str(self.rows),))
+
+    def _insert_buckets(self, document_id, signature):
+        self.conn.executemany(
+            "INSERT INTO buckets (band, bucket, document) VALUES (?, ?, ?)",
+            [(band, bucket, document_id) for band, bucket in self._band_keys(signature)],
+        )
+
+    def lookup(self, signature, fingerprint=None):
+        """Most similar unexpired CV at or above the threshold: {"label", "similarity", "agents"}, or None.
+
+        "agents" is None when the entry was produced under another `fingerprint`,
+        so a stale match can still be flagged but its results are not reused.
+        """
+        if signature is None:
+            return None
+        best = None
+        oldest = time.time() - self.ttl_seconds
+        with self.lock:
+            candidates = set()
+            for band, bucket in self._band_keys(signature):
+                candidates.update(row[0] for row in self.conn.execute(
+                    "SELECT document FROM buckets WHERE band = ? AND bucket = ?", (band, bucket)
+                ))
+            for document_id in candidates:
+                row = self.conn.execute(
+                    "SELECT label, signature, agents, fingerprint FROM documents WHERE id = ? AND created_at >= ?",
+                    (document_id, oldest),
+                ).fetchone()
+                if row is None:
+                    continue
+                label, blob, agents, stored = row
+                score = similarity(signature, array("Q", blob))
+                if score >= self.threshold and (best is None or score > best["similarity"]):
+                    best = {"label": label, "similarity": score, "agents": agents if stored == fingerprint else None}
+        if best is not None and best["agents"] is not None:
+            best["agents"] = json.loads(best["agents"])
+        return best
+
+    def add(self, signature, cv_hash, label, agents, fingerprint=""):
+        """Index an evaluated CV; re-adding a CV replaces its results and restarts its expiry"""
+        if signature is None:
+            return
+        now = time.time()
+        with self.lock:
+            self._expire(now)
+            row = self.conn.execute("SELECT id FROM documents WHERE cv_hash = ?", (cv_hash,)).fetchone()
+            agents = json.dumps(agents, ensure_ascii=False)
+            if row is not None:
+                self.conn.execute(
+                    "UPDATE documents SET label = ?, agents = ?, fingerprint = ?, created_at = ? WHERE id = ?",
+                    (label, agents, fingerprint, now, row[0]),
+                )
+            else:
+                cursor = self.conn.execute(
+                    "INSERT INTO documents (label, cv_hash, signature, agents, fingerprint, created_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (label, cv_hash, signature.tobytes(), agents, fingerprint, now),
+                )
+                self._insert_buckets(cursor.lastrowid, signature)
+            self.conn.commit()
+
+    def _expire(self, now):
+        oldest = now - self.ttl_seconds
+        self.conn.execute(
+            "DELETE FROM buckets WHERE document IN (SELECT id FROM documents WHERE created_at < ?)", (oldest,)
+        )
+        self.conn.execute("DELETE FROM documents WHERE created_at < ?", (oldest,))
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def index_path():
+    return os.environ.get("CV_DUPLICATE_INDEX", os.path.join(".cache", "duplicates.sqlite"))
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = DuplicateIndex(index_path())
+        return _index
+
+
+def configure(threshold):
+    """Replace the process-wide index with one using a different similarity threshold"""
+    global _index
+    with _index_lock:
+        _index = DuplicateIndex(index_path(), threshold=threshold)
@@ -0,0 +1,175 @@
+import functools
+import os
+import re
+
+import cv_sections
+import document_reader
+import rate_limiter
+
+
+# Largest CV text sent to the model, in estimated tokens; longer texts are cut section by section
+MAX_CV_TOKENS = int(os.environ.get("CV_MAX_CV_TOKENS", 6000))
+# Lines at the top and bottom of each page where running headers, footers and page numbers sit
+BOUNDARY_LINES = 3
+TRUNCATION_MARKER = "[...]"
+
+_SPACE_RE = re.compile(r"[ \t\u00a0\u2000-\u200a\u202f\u3000]+")
+_INVISIBLE_RE = re.compile(r"[\u200b-\u200d\u2060\ufeff\u00ad]")
+# "Page 2 of 3", "Halaman 2 dari 3", "Hal. 2", alone or at the end of a running header or footer
+_PAGE_SUFFIX_RE = re.compile(
+    r"[\s|·•,\-–—]*\b(?:page|halaman|hal\.?)\s*\d+(?:\s*(?:of|dari|/)\s*\d+)?\s*$", re.IGNORECASE
+)
+# A bare page number ("2", "- 2 -", "2/3"); only dropped at a page boundary and when it is that page's number
+_PAGE_NUMBER_RE = re.compile(r"^(?:[-–—]\s*(\d{1,3})\s*[-–—]|(\d{1,3})(?:\s*(?:of|dari|/)\s*\d{1,3})?)$", re.IGNORECASE)
+# Horizontal rules and other lines made only of decoration; lone bullets are kept
+_RULE_RE = re.compile(r"^[\s#*_=~|\-–—.]{3,}$")
+# Markdown left by converters: heading marks, emphasis, images, links and empty table cells
+_MD_HEADING_RE = re.compile(r"^#{1,6}\s+")
+_MD_EMPHASIS_RE = re.compile(r"(\*\*|__)(?=[^\s*_])(.+?)(?<=[^\s*_])\1")
+_MD_IMAGE_RE = re.compile(r"!\[[^\]]*\]\([^)]*\)")
+_MD_LINK_RE = re.compile(r"\[([^\]]+)\]\(([^)\s]+)\)")
+_EMPTY_CELLS_RE = re.compile(r"(?:\s*\|\s*){2,}")
+
+
+def _link(match):
+    text, url = match.groups()
+    return url if text.strip() == url else f"{text} ({url})"
+
+
+def clean_line(line):
+    """One line without markdown noise, page markers and repeated whitespace"""
+    line = _INVISIBLE_RE.sub("", line)
+    if _RULE_RE.match(line):
+        return ""
+    line = _MD_IMAGE_RE.sub("", line)
+    line = _MD_LINK_RE.sub(_link, line)
+    line = _MD_EMPHASIS_RE.sub(r"\2", line)
+    line = _MD_HEADING_RE.sub("", line.strip())
+    line = _EMPTY_CELLS_RE.sub(" | ", line)
+    line = _SPACE_RE.sub(" ", line).strip(" |")
+    line = _PAGE_SUFFIX_RE.sub("", line)
+    if _RULE_RE.match(line):
+        return ""
+    return line
+
+
+def _boundary(page):
+    """Indices of the first and last non-empty lines of a page"""
+    filled = [index for index, line in enumerate(page) if line]
+    return set(filled[:BOUNDARY_LINES] + filled[-BOUNDARY_LINES:])
+
+
+def _page_number(line):
+    match = _PAGE_NUMBER_RE.match(line)
+    return int(match.group(1) or match.group(2)) if match else None
+
+
+def normalize(cv_text):
+    """(text, lines removed): cleaned lines without page furniture, at most one blank line in a row.
+
+    Only lines at page boundaries are treated as running headers and
+    footers: one found at the boundary of two or more pages is kept where
+    it first appears and dropped from later pages, and a bare number there
+    is dropped when it matches the page. Lines inside the pages are never
+    dropped, apart from a line repeating the one right before it.
+    """
+    raw_pages = [page.splitlines() for page in cv_text.split(document_reader.PAGE_BREAK)]
+    pages = [[clean_line(raw) for raw in page] for page in raw_pages]
+    # Lines that cleaning left empty (rules, "Halaman 2 dari 3") count as removed
+    removed = sum(1 for page in raw_pages for raw in page if raw.strip()) - sum(1 for page in pages for line in page if line)
+
+    dropped = set()
+    if len(pages) > 1:
+        boundaries = [_boundary(page) for page in pages]
+        pages_seen = {}
+        for number, (page, boundary) in enumerate(zip(pages, boundaries)):
+            for key in {page[index].casefold() for index in boundary}:
+                pages_seen.setdefault(key, []).append(number)
+        for number, (page, boundary) in enumerate(zip(pages, boundaries)):
+            for index in boundary:
+                line = page[index]
+                seen = pages_seen[line.casefold()]
+                if _page_number(line) == number + 1:
+                    dropped.add((number, index))
+                elif len(seen) > 1 and seen[0] < number and not cv_sections.heading_section(line):
+                    dropped.add((number, index))
+
+    lines = []
+    for number, page in enumerate(pages):
+        for index, line in enumerate(page):
+            if (number, index) in dropped or (line and lines and line == lines[-1]):
+                removed += 1
+                continue
+            if line or (lines and lines[-1]):
+                lines.append(line)
+    return "\n".join(lines).strip(), removed
+
+
+def _blocks(text):
+    """Lines grouped into blocks that each start at a section heading"""
+    blocks = [[]]
+    for line in text.split("\n"):
+        if cv_sections.heading_section(line) and blocks[-1]:
+            blocks.append([])
+        blocks[-1].append(line)
+    return blocks
+
+
+def cap_tokens(text, max_tokens):
+    """(text, truncated): text cut to about `max_tokens`, trimming the longest sections first.
+
+    Every section keeps its heading and opening lines, so an overlong work
+    history cannot crowd out education or skills.
+    """
+    tokens = rate_limiter.estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text, False
+    budget = int(len(text) * max_tokens / tokens)
+    blocks = _blocks(text)
+    sizes = [len("\n".join(block)) + 1 for block in blocks]
+
+    # Largest per-block allowance whose total fits the budget: small sections stay whole
+    cap = max(sizes)
+    remaining = budget
+    for position, size in enumerate(sorted(sizes)):
+        share = remaining // (len(sizes) - position)
+        if size > share:
+            cap = share
+            break
+        remaining -= size
+
+    kept = []
+    for block, size in zip(blocks, sizes):
+        if size <= cap:
+            kept.extend(block)
+            continue
+        used = 0
+        for index, line in enumerate(block):
+            used += len(line) + 1
+            if index and used > cap - len(TRUNCATION_MARKER):
+                break
+            kept.append(line)
+        kept.append(TRUNCATION_MARKER)
+    return "\n".join(kept), True
+
+
+@functools.lru_cache(maxsize=256)
+def _compact(cv_text, max_tokens):
+    text, removed = normalize(cv_text)
+    text, truncated = cap_tokens(text, max_tokens)
+    before = rate_limiter.estimate_tokens(cv_text)
+    after = rate_limiter.estimate_tokens(text)
+    report = {
+        "tokens_before": before,
+        "tokens_after": after,
+        "reduction": round(1 - after / before, 3),
+        "lines_removed": removed,
+        "truncated": truncated,
+    }
+    return text, report
+
+
+def compact(cv_text, max_tokens=None):
+    """(text sent to the model, report of the token reduction) for one CV; cached per text"""
+    text, report = _compact(cv_text, MAX_CV_TOKENS if max_tokens is None else max_tokens)
+    return text, dict(report)
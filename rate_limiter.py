@@ -0,0 +1,165 @@
+import os
+import random
+import threading
+import time
+
+import metrics
+
+
+# HTTP status codes that mean "try again later" rather than "this request is wrong"
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at a per-minute rate"""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount=1):
+        """Block until `amount` tokens are available, then take them"""
+        # A single request larger than the bucket would otherwise wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit that grows additively on success and halves on throttling (AIMD)"""
+
+    def __init__(self, initial, minimum=1, maximum=8):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        # +1 slot for every `limit` successful calls
+        with self.condition:
+            self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self.condition.notify_all()
+
+    def on_throttle(self):
+        with self.condition:
+            self.limit = max(self.minimum, self.limit / 2)
+
+
+def status_code(error):
+    """Best-effort HTTP status code of an API exception (google.api_core sets `.code`)"""
+    for attr in ("code", "status_code"):
+        code = getattr(error, attr, None)
+        if callable(code):
+            try:
+                code = code()
+            except Exception:
+                code = None
+        if isinstance(code, int):
+            return code
+        # grpc StatusCode enums carry (number, name); map the throttling ones
+        name = getattr(code, "name", None)
+        if name == "RESOURCE_EXHAUSTED":
+            return 429
+        if name in ("UNAVAILABLE", "INTERNAL", "DEADLINE_EXCEEDED"):
+            return 503
+    return None
+
+
+def is_retryable(error):
+    return status_code(error) in RETRYABLE_STATUS_CODES
+
+
+def estimate_tokens(text):
+    """Rough token count for quota accounting (~4 characters per token)"""
+    return max(1, len(text) // 4)
+
+
+class RateLimiter:
+    """Shared limiter for model calls: requests/tokens per minute, retries and adaptive concurrency"""
+
+    def __init__(self, requests_per_minute=10, tokens_per_minute=1_000_000,
+                 max_concurrency=5, min_concurrency=1, max_retries=5,
+                 base_delay=1.0, max_delay=60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency, max_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, *args, estimated_tokens=1, **kwargs):
+        """Call `fn(*args, **kwargs)` under the limiter, retrying throttled/server errors"""
+        attempt = 0
+        while True:
+            self.requests.acquire(1)
+            self.tokens.acquire(estimated_tokens)
+            self.concurrency.acquire()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                self.concurrency.release()
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                self.concurrency.on_throttle()
+                metrics.note_retry()
+                time.sleep(self.backoff_delay(attempt))
+                attempt += 1
+                continue
+            self.concurrency.release()
+            self.concurrency.on_success()
+            return result
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def configure(**kwargs):
+    """Replace the process-wide limiter with one built from `kwargs`"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = RateLimiter(**kwargs)
+    return _limiter
+
+
+def get_limiter():
+    """Process-wide limiter shared by every session, configured from the environment on first use"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = RateLimiter(
+                requests_per_minute=float(os.environ.get("GEMINI_REQUESTS_PER_MINUTE", 10)),
+                tokens_per_minute=float(os.environ.get("GEMINI_TOKENS_PER_MINUTE", 1_000_000)),
+                max_concurrency=int(os.environ.get("GEMINI_MAX_CONCURRENCY", 5)),
+            )
+        return _limiter
@@ -0,0 +1,186 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import result_cache
+
+
+# BM25 parameters: term-frequency saturation and document-length normalisation
+K1 = 1.5
+B = 0.75
+
+_WORD_RE = re.compile(r"[^\W_][\w+#.-]*[\w+#]|[^\W\d_]", re.UNICODE)
+
+# Common Indonesian and English words that say nothing about a role
+STOPWORDS = set("""
+dan atau yang di ke dari untuk dengan dalam pada sebagai adalah akan ini itu oleh serta juga telah sudah
+kami kita anda saya kamu mereka dia ia para secara lebih sangat dapat bisa harus memiliki mampu menjadi
+tersebut setiap seluruh semua bagi tentang hingga sampai antara karena agar supaya jika bila tidak bukan
+minimal maksimal pengalaman tahun bidang terkait posisi kandidat calon pelamar lowongan kerja bekerja
+the a an and or of to in on at for with by from as is are be been being will would can could should
+we you our your they their this that these those it its who which what have has had not no do does
+experience years year role position candidate job work working team strong ability able good excellent
+mencari dibutuhkan membutuhkan diutamakan menguasai memahami berpengalaman kualifikasi persyaratan syarat
+tanggung jawab deskripsi perusahaan baik mampu minimum looking seeking required requirements preferred plus
+responsibilities qualifications knowledge skills understanding familiar must including etc
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased terms of a text; keeps tokens like c++, c#, node.js and ci/cd parts, drops stopwords"""
+    terms = []
+    for token in _WORD_RE.findall(text.lower()):
+        token = token.strip(".-")
+        if len(token) > 1 and token not in STOPWORDS and not token.isdigit():
+            terms.append(token)
+    return terms
+
+
+def job_keywords(job_description, top=20):
+    """The job description's most frequent terms, in order of first appearance among ties"""
+    terms = tokenize(job_description)
+    counts = Counter(terms)
+    first = {}
+    for position, term in enumerate(terms):
+        first.setdefault(term, position)
+    return sorted(counts, key=lambda term: (-counts[term], first[term]))[:top]
+
+
+def keyword_matches(text, keywords):
+    """(matched, missing) keywords for a text"""
+    present = set(tokenize(text))
+    matched = [keyword for keyword in keywords if keyword in present]
+    return matched, [keyword for keyword in keywords if keyword not in present]
+
+
+class RelevanceIndex:
+    """Incrementally updated on-disk inverted index of CV texts, ranked against a job description with BM25.
+
+    Postings live in SQLite, so adding or replacing one CV only touches its
+    own rows. Ranking reads the postings of the query terms alone and scores
+    every candidate at once with NumPy.
+    """
+
+    def __init__(self, path):
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, label TEXT NOT NULL UNIQUE, cv_hash TEXT NOT NULL,"
+            " length INTEGER NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS terms (id INTEGER PRIMARY KEY AUTOINCREMENT, term TEXT NOT NULL UNIQUE, df INTEGER NOT NULL)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS postings (term INTEGER NOT NULL, document INTEGER NOT NULL, tf INTEGER NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS postings_term ON postings (term)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS postings_document ON postings (document)")
+        self.conn.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _remove(self, document_id):
+        self.conn.execute(
+            "UPDATE terms SET df = df - 1 WHERE id IN (SELECT term FROM postings WHERE document = ?)", (document_id,)
+        )
+        self.conn.execute("DELETE FROM postings WHERE document = ?", (document_id,))
+        self.conn.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def add(self, label, cv_text):
+        """Index or re-index one CV under `label`; unchanged text is a no-op"""
+        cv_hash = result_cache.text_hash(cv_text)
+        counts = Counter(tokenize(cv_text))
+        with self.lock:
+            row = self.conn.execute("SELECT id, cv_hash FROM documents WHERE label = ?", (label,)).fetchone()
+            if row is not None and row[1] == cv_hash:
+                return
+            if row is not None:
+                self._remove(row[0])
+            document_id = self.conn.execute(
+                "INSERT INTO documents (label, cv_hash, length, updated_at) VALUES (?, ?, ?, ?)",
+                (label, cv_hash, sum(counts.values()), time.time()),
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                [(term,) for term in counts],
+            )
+            term_ids = dict(self.conn.execute(
+                f"SELECT term, id FROM terms WHERE term IN ({','.join('?' * len(counts))})", list(counts)
+            ).fetchall()) if counts else {}
+            self.conn.executemany(
+                "INSERT INTO postings (term, document, tf) VALUES (?, ?, ?)",
+                [(term_ids[term], document_id, tf) for term, tf in counts.items()],
+            )
+            self.conn.commit()
+
+    def remove(self, label):
+        with self.lock:
+            row = self.conn.execute("SELECT id FROM documents WHERE label = ?", (label,)).fetchone()
+            if row is not None:
+                self._remove(row[0])
+                self.conn.commit()
+
+    def rank(self, job_description, labels=None, top_k=None):
+        """[(label, score)] best first; `labels` restricts the ranking to those CVs"""
+        import numpy as np
+
+        query = Counter(tokenize(job_description))
+        with self.lock:
+            documents = self.conn.execute("SELECT id, label, length FROM documents ORDER BY id").fetchall()
+            if labels is not None:
+                wanted = set(labels)
+                documents = [document for document in documents if document[1] in wanted]
+            if not documents or not query:
+                return [(label, 0.0) for _, label, _ in documents][:top_k]
+            terms = self.conn.execute(
+                f"SELECT id, term, df FROM terms WHERE term IN ({','.join('?' * len(query))}) AND df > 0", list(query)
+            ).fetchall()
+            postings = self.conn.execute(
+                f"SELECT term, document, tf FROM postings WHERE term IN ({','.join('?' * len(terms))})",
+                [term_id for term_id, _, _ in terms],
+            ).fetchall() if terms else []
+            total = self.conn.execute("SELECT COUNT(*), SUM(length) FROM documents").fetchone()
+
+        ids = np.array([document_id for document_id, _, _ in documents], dtype=np.int64)
+        lengths = np.array([length for _, _, length in documents], dtype=np.float64)
+        scores = np.zeros(len(documents))
+        if postings:
+            count, total_length = total
+            average_length = total_length / count if total_length else 1.0
+            # Repeated query terms weigh more, with diminishing returns
+            term_ids = np.array([term_id for term_id, _, _ in terms], dtype=np.int64)
+            weights = np.array([math.log(1 + (count - df + 0.5) / (df + 0.5)) * (1 + math.log(query[term]))
+                                for _, term, df in terms])
+            term_order = np.argsort(term_ids)
+            post = np.array(postings, dtype=np.int64)
+            positions = np.searchsorted(ids, post[:, 1])
+            # Postings of CVs outside `labels` are dropped
+            valid = (positions < len(ids)) & (ids[np.minimum(positions, len(ids) - 1)] == post[:, 1])
+            post, positions = post[valid], positions[valid]
+            tf = post[:, 2].astype(np.float64)
+            weight = weights[term_order][np.searchsorted(term_ids[term_order], post[:, 0])]
+            norm = K1 * (1 - B + B * lengths[positions] / average_length)
+            np.add.at(scores, positions, weight * tf * (K1 + 1) / (tf + norm))
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(documents[i][1], float(scores[i])) for i in order]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = RelevanceIndex(os.environ.get("CV_RELEVANCE_INDEX", os.path.join(".cache", "relevance.sqlite")))
+        return _index
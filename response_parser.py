@@ -0,0 +1,284 @@
+import json
+import re
+
+
+# A fenced block (```json ... ```); the closing fence may be missing when a response was cut off
+_FENCE_RE = re.compile(r"```(?:json|JSON)?[ \t]*\n?(.*?)(?:```|$)", re.DOTALL)
+_SCHEMA_MARKER = "struktur berikut"
+# "{" positions tried as the start of the object when prose before it contains braces
+MAX_OBJECT_STARTS = 20
+
+
+class ResponseParseError(ValueError):
+    """The response contains no JSON object that could be parsed or repaired"""
+
+
+def extract_json_text(response_text):
+    """The part of a model response that should hold the JSON object"""
+    for match in _FENCE_RE.finditer(response_text):
+        if "{" in match.group(1):
+            return match.group(1)
+    start = response_text.find("{")
+    if start == -1:
+        raise ResponseParseError("no JSON object in response")
+    return response_text[start:]
+
+
+def _strip_trailing_comma(out):
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def repair_json(text):
+    """Fix the usual defects of model JSON: stray commas, prose after the object and truncation.
+
+    Scans the first object with a string-aware bracket stack. A truncated object
+    is closed where it stopped or, if that is not valid, at the last complete
+    member, so a half-written member is dropped rather than failing the parse.
+    """
+    out = []
+    stack = []
+    in_string = escape = started = False
+    safe_point = None
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+            continue
+        if not started:
+            if char != "{":
+                continue
+            started = True
+        if char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if not stack:
+                break
+            out.append(stack.pop())
+            if not stack:
+                return "".join(out)
+            safe_point = (len(out), list(stack))
+            continue
+        elif char == ",":
+            # Drop doubled commas and commas right after an opening bracket
+            previous = next((c for c in reversed(out) if not c.isspace()), "")
+            if previous in ",{[":
+                continue
+            safe_point = (len(out), list(stack))
+        out.append(char)
+
+    if not started:
+        raise ResponseParseError("no JSON object in response")
+
+    # Truncated: close everything that is still open
+    candidate = out + (['"'] if in_string else [])
+    _strip_trailing_comma(candidate)
+    candidate = "".join(candidate) + "".join(reversed(stack))
+    try:
+        json.loads(candidate)
+        return candidate
+    except json.JSONDecodeError:
+        pass
+    if safe_point is None:
+        return "{}"
+    length, open_brackets = safe_point
+    out = out[:length]
+    _strip_trailing_comma(out)
+    return "".join(out) + "".join(reversed(open_brackets))
+
+
+def _parse_object(json_text):
+    # (object, repaired) for text starting at a "{"
+    try:
+        result = json.loads(json_text)
+        repaired = False
+    except json.JSONDecodeError:
+        try:
+            result = json.loads(repair_json(json_text))
+        except json.JSONDecodeError as e:
+            raise ResponseParseError(str(e)) from e
+        repaired = True
+    if not isinstance(result, dict):
+        raise ResponseParseError("response JSON is not an object")
+    return result, repaired
+
+
+def parse_json_response(response_text):
+    """(object, repaired) for a model response; raises ResponseParseError when nothing is usable.
+
+    Each "{" is tried in turn as the start of the object, so braces in prose
+    before it ("Catatan {penting}: {...}") are skipped. An empty object is
+    only returned when no later start gives anything more.
+    """
+    json_text = extract_json_text(response_text)
+    start, fallback, error = 0, None, None
+    for _ in range(MAX_OBJECT_STARTS):
+        try:
+            result, repaired = _parse_object(json_text[start:])
+        except ResponseParseError as e:
+            error = error or e
+        else:
+            if result:
+                return result, repaired or start > 0
+            fallback = fallback or (result, True)
+        start = json_text.find("{", start + 1)
+        if start == -1:
+            break
+    if fallback is not None:
+        return fallback
+    raise error
+
+
+def schema_from_prompt(prompt):
+    """The JSON output template at the end of a prompt, as a dict"""
+    start = prompt.index("{", prompt.index(_SCHEMA_MARKER))
+    template = prompt[start:]
+    # Prompts rendered with str.format escape their braces
+    if template.startswith("{{"):
+        template = template.replace("{{", "{").replace("}}", "}")
+    return json.loads(template)
+
+
+def is_criterion(node):
+    return isinstance(node, dict) and "score" in node
+
+
+def has_criteria(node):
+    """Whether any criterion appears anywhere in `node`"""
+    if not isinstance(node, dict):
+        return False
+    return any(is_criterion(value) or has_criteria(value) for value in node.values())
+
+
+def _number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    try:
+        number = float(str(value).strip().split("/")[0])
+    except ValueError:
+        return None
+    return int(number) if number.is_integer() else number
+
+
+def normalize_criterion(node, template):
+    """Criterion with a numeric score clamped to the template's range and every field present; None if unusable"""
+    if not isinstance(node, dict):
+        return None
+    score = _number(node.get("score"))
+    if score is None:
+        return None
+    criterion = dict(template)
+    criterion.update(node)
+    # The bounds come from the rubric, never from the model
+    if "max" in template:
+        criterion["max"] = template["max"]
+        score = max(0, min(score, template["max"]))
+    if "min" in template:
+        criterion["min"] = template["min"]
+        score = max(template["min"], min(score, 0))
+    criterion["score"] = score
+    criterion["penilaian"] = str(criterion.get("penilaian") or "")
+    criterion["alasan"] = str(criterion.get("alasan") or "")
+    return criterion
+
+
+def validate(result, template, prefix=""):
+    """Check `result` against `template`: (normalised result, dotted paths of missing or invalid fields).
+
+    Criteria are normalised; other fields only need the template's type.
+    Fields not in the template are kept as they are.
+    """
+    normalized = dict(result) if isinstance(result, dict) else {}
+    missing = []
+    for key, expected in template.items():
+        path = prefix + key
+        value = normalized.get(key)
+        if is_criterion(expected):
+            criterion = normalize_criterion(value, expected)
+            if criterion is None:
+                normalized.pop(key, None)
+                missing.append(path)
+            else:
+                normalized[key] = criterion
+        elif isinstance(expected, dict):
+            nested, nested_missing = validate(value, expected, path + ".")
+            normalized[key] = nested
+            missing.extend(nested_missing)
+        elif isinstance(expected, list):
+            if isinstance(value, list):
+                normalized[key] = [str(item) for item in value]
+            else:
+                normalized.pop(key, None)
+                missing.append(path)
+        elif isinstance(expected, str):
+            if isinstance(value, str):
+                continue
+            normalized.pop(key, None)
+            missing.append(path)
+        elif _number(value) is not None:
+            normalized[key] = _number(value)
+        else:
+            normalized.pop(key, None)
+            missing.append(path)
+    return normalized, missing
+
+
+def subset_template(template, paths):
+    """The part of `template` covering the given dotted paths"""
+    subset = {}
+    for path in paths:
+        source, target = template, subset
+        keys = path.split(".")
+        for key in keys[:-1]:
+            source = source[key]
+            target = target.setdefault(key, {})
+        target[keys[-1]] = source[keys[-1]]
+    return subset
+
+
+def pick(result, paths):
+    """The values of `result` at the given dotted paths, where present"""
+    picked = {}
+    for path in paths:
+        source, target = result, picked
+        keys = path.split(".")
+        for key in keys[:-1]:
+            source = source.get(key) if isinstance(source, dict) else None
+            target = target.setdefault(key, {})
+        if isinstance(source, dict) and keys[-1] in source:
+            target[keys[-1]] = source[keys[-1]]
+    return picked
+
+
+def merge(result, update):
+    """Deep-merge `update` into a copy of `result`"""
+    merged = dict(result)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict) and not is_criterion(value):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def fill_defaults(result, template):
+    """Give every non-criterion field the template's empty value if it is still missing"""
+    filled = dict(result)
+    for key, expected in template.items():
+        if is_criterion(expected):
+            continue
+        if isinstance(expected, dict):
+            filled[key] = fill_defaults(filled.get(key) or {}, expected)
+        elif key not in filled:
+            filled[key] = json.loads(json.dumps(expected))
+    return filled
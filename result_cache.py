@@ -0,0 +1,174 @@
+import copy
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def text_hash(text):
+    """SHA-256 hex digest of a string"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=64)
+def template_hash(prompt_template):
+    """text_hash of a prompt template, computed once per template"""
+    return text_hash(prompt_template)
+
+
+def cache_key(input_text, agent_name, prompt_template, model_id):
+    """Content-addressed key: changing the input, prompt template or model yields a new key"""
+    parts = [text_hash(input_text), agent_name, template_hash(prompt_template), model_id]
+    return text_hash("\x1f".join(parts))
+
+
+class LRUCache:
+    """Small thread-safe in-memory LRU; entries older than `ttl_seconds` are dropped on access"""
+
+    def __init__(self, max_entries=256, ttl_seconds=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            created_at, value = self.entries[key]
+            if self.ttl_seconds is not None and time.time() - created_at > self.ttl_seconds:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            # Callers may mutate results, so never hand out the cached object itself
+            return copy.deepcopy(value)
+
+    def set(self, key, value, created_at=None):
+        """Store `value`; `created_at` keeps the age of an entry copied from another tier"""
+        with self.lock:
+            self.entries[key] = (time.time() if created_at is None else created_at, copy.deepcopy(value))
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+class SQLiteCache:
+    """On-disk cache tier with TTL expiry and least-recently-used eviction beyond `max_entries`"""
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_entries=10_000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed_at)")
+        self.conn.commit()
+
+    def get(self, key):
+        entry = self.lookup(key)
+        return None if entry is None else entry[0]
+
+    def lookup(self, key):
+        """(value, created_at) of a live entry, or None"""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self.conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+        return json.loads(value), created_at
+
+    def set(self, key, value):
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self.evict(now)
+            self.conn.commit()
+
+    def evict(self, now):
+        self.conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+        self.conn.execute(
+            "DELETE FROM results WHERE key IN ("
+            " SELECT key FROM results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class ResultCache:
+    """Two-tier (memory, then SQLite) cache for agent and coordinator results"""
+
+    def __init__(self, path, memory_entries=256, ttl_seconds=7 * 24 * 3600, max_entries=10_000):
+        self.memory = LRUCache(memory_entries, ttl_seconds)
+        self.disk = SQLiteCache(path, ttl_seconds, max_entries)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None:
+            entry = self.disk.lookup(key)
+            if entry is not None:
+                # The memory copy expires with the disk entry, not a full TTL later
+                value, created_at = entry
+                self.memory.set(key, value, created_at)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+
+class NullCache:
+    """Cache that stores nothing, for benchmarks and debugging"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def set_cache(cache):
+    """Replace the process-wide result cache (e.g. with NullCache())"""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def get_cache():
+    """Process-wide result cache, configured from the environment on first use"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResultCache(
+                os.environ.get("CV_CACHE_PATH", os.path.join(".cache", "results.sqlite")),
+                memory_entries=int(os.environ.get("CV_CACHE_MEMORY_ENTRIES", 256)),
+                ttl_seconds=float(os.environ.get("CV_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+                max_entries=int(os.environ.get("CV_CACHE_MAX_ENTRIES", 10_000)),
+            )
+        return _cache
@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import evaluator
+import local_checks
+
+
+class RevisionStore:
+    """Latest extracted text and agent results per candidate, so a revised CV only re-runs what changed.
+
+    Each result is stored with its fingerprint (prompt template, model or
+    routing, engine); a result whose fingerprint no longer matches, or that
+    is older than `ttl_seconds`, is not reused.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600):
+        self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS candidates ("
+            " candidate TEXT PRIMARY KEY, cv_text TEXT NOT NULL,"
+            " agents TEXT NOT NULL, updated_at REAL NOT NULL,"
+            " fingerprints TEXT NOT NULL DEFAULT '{}')"
+        )
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(candidates)")]
+        if "fingerprints" not in columns:
+            # Rows written before fingerprints were stored match nothing and are never reused
+            self.conn.execute("ALTER TABLE candidates ADD COLUMN fingerprints TEXT NOT NULL DEFAULT '{}'")
+        self.conn.commit()
+
+    def get(self, candidate):
+        """(cv_text, agent results, fingerprints) of the candidate's last evaluation, or None if absent or expired"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT cv_text, agents, fingerprints, updated_at FROM candidates WHERE candidate = ?", (candidate,)
+            ).fetchone()
+        if row is None or time.time() - row[3] > self.ttl_seconds:
+            return None
+        return row[0], json.loads(row[1]), json.loads(row[2])
+
+    def put(self, candidate, cv_text, agents, fingerprints):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO candidates (candidate, cv_text, agents, fingerprints, updated_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (candidate, cv_text, json.dumps(agents, ensure_ascii=False), json.dumps(fingerprints), time.time()),
+            )
+            self.conn.execute("DELETE FROM candidates WHERE updated_at < ?", (time.time() - self.ttl_seconds,))
+            self.conn.commit()
+
+
+def candidate_key(cv_text):
+    """Identity of the candidate behind a CV: the email address, or None if there is none.
+
+    Name lines are not used: many CVs open with "CURRICULUM VITAE" and
+    would all share one identity.
+    """
+    match = local_checks.EMAIL_RE.search(cv_text)
+    return match.group(0).lower() if match else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RevisionStore(
+                os.environ.get("CV_REVISIONS_PATH", os.path.join(".cache", "revisions.sqlite")),
+                ttl_seconds=float(os.environ.get("CV_REVISIONS_TTL_SECONDS", 7 * 24 * 3600)),
+            )
+        return _store
+
+
+def run_evaluation(cv_text, engine="agents", on_complete=None, thread_initializer=None, on_field=None,
+                   job_description=None):
+    """evaluator.run_evaluation that reuses a candidate's previous results for the agents whose sections are unchanged"""
+    candidate = candidate_key(cv_text)
+    previous = get_store().get(candidate) if candidate else None
+    previous_text = previous_results = None
+    if previous:
+        previous_text, stored, fingerprints = previous
+        # Only results produced by the current prompts (with or without a job description), model and engine are reused
+        previous_results = {agent_name: result for agent_name, result in stored.items()
+                            if agent_name in evaluator.AGENT_LABELS
+                            and fingerprints.get(agent_name) == evaluator.result_fingerprint(agent_name, engine, job_description)}
+    results = evaluator.run_evaluation(
+        cv_text, engine=engine, on_complete=on_complete, thread_initializer=thread_initializer,
+        on_field=on_field, previous_text=previous_text, previous_results=previous_results,
+        job_description=job_description,
+    )
+    if candidate:
+        # Failed agents are stored as None and simply re-run next time
+        fingerprints = {
+            agent_name: evaluator.result_fingerprint(agent_name, engine, job_description) for agent_name in results
+        }
+        get_store().put(candidate, cv_text, results, fingerprints)
+    return results
@@ -0,0 +1,96 @@
+# Maximum points per agent, as stated in each agent's rubric (210 in total)
+AGENT_MAX_SCORES = {
+    "format_ats": 60,
+    "contact_summary": 35,
+    "work_experience": 55,
+    "education_skills": 30,
+    "optional_mistakes": 30,
+}
+
+# (minimum percentage, kategori), checked from the top
+CATEGORY_THRESHOLDS = [
+    (90, "Sangat Baik"),
+    (80, "Baik"),
+    (70, "Cukup"),
+    (50, "Perlu Perbaikan"),
+]
+LOWEST_CATEGORY = "Membutuhkan Revisi Menyeluruh"
+
+
+def criterion_points(node):
+    """Sum the `score` of every leaf criterion in an agent result (penalties are negative)"""
+    if not isinstance(node, dict):
+        return 0
+    if "score" in node:
+        try:
+            return float(node["score"])
+        except (TypeError, ValueError):
+            return 0
+    return sum(criterion_points(value) for value in node.values())
+
+
+def agent_points(result):
+    """Points earned by one agent, recomputed from its criteria rather than trusting `total_score`"""
+    criteria = {key: value for key, value in result.items() if isinstance(value, dict)}
+    return criterion_points(criteria)
+
+
+def categorize(percentage):
+    for minimum, kategori in CATEGORY_THRESHOLDS:
+        if percentage >= minimum:
+            return kategori
+    return LOWEST_CATEGORY
+
+
+def aggregate_scores(results):
+    """Normalise the agents' points to a 0-100 score and pick its kategori.
+
+    Agents that failed (None) are left out of both the points and the maximum,
+    so one failed call does not drag the whole CV into a lower category.
+    """
+    earned = 0
+    maximum = 0
+    for agent_name, agent_max in AGENT_MAX_SCORES.items():
+        result = results.get(agent_name)
+        if not result:
+            continue
+        earned += agent_points(result)
+        maximum += agent_max
+
+    percentage = max(0.0, min(100.0, earned / maximum * 100)) if maximum else 0.0
+    percentage = round(percentage, 1)
+    return {
+        "total_score": percentage,
+        "max_score": 100,
+        "persentase": percentage,
+        "kategori": categorize(percentage),
+    }
+
+
+def agent_percentage(agent_name, result):
+    return agent_points(result) / AGENT_MAX_SCORES[agent_name] * 100
+
+
+def local_summary(results, max_items=5, max_suggestions=7):
+    """Qualitative summary built from the agents' own output, used when the coordinator call is skipped"""
+    scored = sorted(
+        ((agent_percentage(name, result), result) for name, result in results.items()
+         if result and name in AGENT_MAX_SCORES),
+        key=lambda item: item[0],
+        reverse=True,
+    )
+    kekuatan = [result["ringkasan"] for percentage, result in scored
+                if percentage >= 80 and result.get("ringkasan")][:max_items]
+    kekurangan = [result["ringkasan"] for percentage, result in reversed(scored)
+                  if percentage < 70 and result.get("ringkasan")][:max_items]
+
+    saran_perbaikan = []
+    for percentage, result in reversed(scored):
+        for saran in result.get("saran_perbaikan", []):
+            if saran not in saran_perbaikan:
+                saran_perbaikan.append(saran)
+    return {
+        "kekuatan": kekuatan,
+        "kekurangan": kekurangan,
+        "saran_perbaikan": saran_perbaikan[:max_suggestions],
+    }
@@ -0,0 +1,66 @@
+import json
+
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalObjectParser:
+    """Parse a streamed JSON object and report each top-level member as soon as it is complete.
+
+    Text before the opening brace (prose, a ```json fence) is skipped. A value
+    is only reported once the character after it has arrived, so a number such
+    as 10 is never reported while the stream might still turn it into 100.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = None  # index just past "{" or the last consumed member
+        self.members = {}
+        self.complete = False
+
+    def _skip(self, pos, chars=_WHITESPACE):
+        while pos < len(self.buffer) and self.buffer[pos] in chars:
+            pos += 1
+        return pos
+
+    def feed(self, chunk):
+        """Add a chunk of text and return the (key, value) pairs completed by it"""
+        self.buffer += chunk
+        completed = []
+        if self.complete:
+            return completed
+        if self.pos is None:
+            start = self.buffer.find("{")
+            if start == -1:
+                return completed
+            self.pos = start + 1
+
+        while True:
+            pos = self._skip(self.pos, _WHITESPACE + ",")
+            if pos >= len(self.buffer):
+                break
+            if self.buffer[pos] == "}":
+                self.pos = pos + 1
+                self.complete = True
+                break
+            try:
+                key, pos = _decoder.raw_decode(self.buffer, pos)
+                pos = self._skip(pos)
+                if pos >= len(self.buffer) or self.buffer[pos] != ":":
+                    break
+                pos = self._skip(pos + 1)
+                value, end = _decoder.raw_decode(self.buffer, pos)
+            except json.JSONDecodeError:
+                # Incomplete (or malformed) member; wait for more text
+                break
+            if end >= len(self.buffer):
+                break
+            self.members[key] = value
+            completed.append((key, value))
+            self.pos = end
+        return completed
+
+    def result(self):
+        """The parsed object once its closing brace has been seen, else None"""
+        return dict(self.members) if self.complete else None